@@ -19,9 +19,49 @@ def create_app():
     app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL", "sqlite:///pass.db")
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+    # --- Batch scoring: rows per bulk INSERT/UPSERT statement ---
+    app.config["RISK_WRITE_CHUNK_SIZE"] = int(os.getenv("RISK_WRITE_CHUNK_SIZE", "1000"))
+    # --- Batch scoring: students per feature/predict/commit chunk ---
+    app.config["SCORING_CHUNK_SIZE"] = int(os.getenv("SCORING_CHUNK_SIZE", "2000"))
+    # --- Batch scoring: local explanations for "at_risk" students (default), "all" or "off" ---
+    app.config["RISK_CONTRIBUTIONS"] = os.getenv("RISK_CONTRIBUTIONS", "at_risk")
+
+    # --- Risk history: "overwrite" keeps one row per student, "append" keeps every run ---
+    app.config["RISK_HISTORY_MODE"] = os.getenv("RISK_HISTORY_MODE", "overwrite")
+    # --- Risk history retention: raw rows older than this are compacted into weekly aggregates ---
+    app.config["RISK_RETENTION_DAYS"] = int(os.getenv("RISK_RETENTION_DAYS", "90"))
+
+    # --- Background prediction jobs (per process) ---
+    app.config["PREDICTION_JOB_WORKERS"] = int(os.getenv("PREDICTION_JOB_WORKERS", "2"))
+    app.config["PREDICTION_JOB_QUEUE_MAX"] = int(os.getenv("PREDICTION_JOB_QUEUE_MAX", "16"))
+    app.config["PREDICTION_JOB_STALE_SECONDS"] = int(os.getenv("PREDICTION_JOB_STALE_SECONDS", "3600"))
+
+    # --- What-if scoring API micro-batching (per process) ---
+    app.config["SCORE_BATCH_MAX_SIZE"] = int(os.getenv("SCORE_BATCH_MAX_SIZE", "256"))
+    app.config["SCORE_BATCH_MAX_WAIT_MS"] = float(os.getenv("SCORE_BATCH_MAX_WAIT_MS", "5"))
+    app.config["SCORE_MAX_INSTANCES"] = int(os.getenv("SCORE_MAX_INSTANCES", "1000"))
+
+    # --- Advisor read cache (serialized responses per process) ---
+    app.config["RESPONSE_CACHE_MAX_ENTRIES"] = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+
+    # --- Blueprint/resource catalog cache (per process) ---
+    app.config["CATALOG_CACHE_MAX_ROWS"] = int(os.getenv("CATALOG_CACHE_MAX_ROWS", "200000"))
+    app.config["CATALOG_VERSION_CHECK_SECONDS"] = float(os.getenv("CATALOG_VERSION_CHECK_SECONDS", "2"))
+
     # --- N+1 verification (prints SQL when SQL_ECHO=1) ---
     app.config["SQLALCHEMY_ECHO"] = os.getenv("SQL_ECHO", "0") == "1"
 
+    # --- Request instrumentation: JSON log line per request / fail on @query_budget overruns ---
+    app.config["REQUEST_LOG"] = os.getenv("REQUEST_LOG", "0") == "1"
+    app.config["QUERY_BUDGET_ENFORCE"] = os.getenv("QUERY_BUDGET_ENFORCE", "0") == "1"
+
+    # --- JWT revocation: how long a worker trusts its cached users.token_version ---
+    app.config["TOKEN_VERSION_TTL_SECONDS"] = float(os.getenv("TOKEN_VERSION_TTL_SECONDS", "30"))
+    app.config["TOKEN_VERSION_CACHE_MAX_ENTRIES"] = int(os.getenv("TOKEN_VERSION_CACHE_MAX_ENTRIES", "10000"))
+
+    # --- Prometheus /api/metrics (open unless a token is set) ---
+    app.config["METRICS_TOKEN"] = os.getenv("METRICS_TOKEN", "")
+
     # --- CORS ---
     cors_origins = os.getenv("CORS_ORIGINS", "http://localhost:5173").split(",")
     cors_origins = [o.strip() for o in cors_origins if o.strip()]
@@ -31,6 +71,16 @@ def create_app():
     db.init_app(app)
     jwt.init_app(app)
 
+    # Server-Timing header, per-request query counter and structured logs
+    from .services.request_timing import init_request_timing
+
+    init_request_timing(app)
+
+    # Prometheus metrics: per-route latency histograms, in-flight, prediction batches
+    from .services.metrics import init_metrics
+
+    init_metrics(app)
+
     # --- JWT error responses (JSON) ---
     @jwt.unauthorized_loader
     def _missing_token(msg):
@@ -49,6 +99,26 @@ def create_app():
 
     with app.app_context():
         db.create_all()
+        # bring existing databases up to the current schema (new columns / indexes)
+        from .migrations import run_migrations
+
+        run_migrations()
+
+    from .services.response_cache import response_cache
+
+    response_cache.max_entries = app.config["RESPONSE_CACHE_MAX_ENTRIES"]
+
+    from .services.principal import token_versions
+
+    token_versions.max_entries = app.config["TOKEN_VERSION_CACHE_MAX_ENTRIES"]
+
+    from .services.catalog_cache import configure_catalog_cache
+
+    configure_catalog_cache(app)
+
+    from .services.online_scoring import configure_score_batcher
+
+    configure_score_batcher(app)
 
     # Register blueprints
     from .routes.auth import bp as auth_bp
@@ -61,6 +131,9 @@ def create_app():
 
     @app.get("/api/health")
     def health():
-        return {"status": "ok"}
+        from .services.catalog_cache import catalog_cache
+        from .services.predict import model_registry
+
+        return {"status": "ok", "model": model_registry.stats(), "catalog_cache": catalog_cache.stats()}
 
     return app
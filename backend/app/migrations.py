@@ -0,0 +1,160 @@
+"""
+Lightweight versioned schema migrations.
+
+db.create_all() only creates missing tables; it never alters existing ones.
+Each migration below brings a live database up to what models.py declares.
+Applied versions are recorded in the schema_migrations table, and every step
+is idempotent (it checks the live schema first), because on a fresh database
+create_all has already built the final shape.
+
+To add a migration: append a (version, description, function) entry to
+MIGRATIONS with the next version number. Never edit or renumber an applied one.
+"""
+import hashlib
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError
+
+from . import db
+
+
+def _has_column(table: str, column: str) -> bool:
+    return any(c["name"] == column for c in inspect(db.engine).get_columns(table))
+
+
+def _add_column(table: str, column: str, ddl: str) -> None:
+    if not _has_column(table, column):
+        db.session.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def _create_index(name: str, table: str, columns: str, unique: bool = False) -> None:
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    db.session.execute(text(f"CREATE {kind} IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
+# -----------------------
+# Migrations
+# -----------------------
+def _m001_latest_risk_pointer():
+    from .services.risk_writer import refresh_latest_risk_pointers
+
+    if not _has_column("students", "latest_risk_id"):
+        _add_column("students", "latest_risk_id", "INTEGER REFERENCES risk_scores(id)")
+        refresh_latest_risk_pointers()
+
+
+def _m002_hot_query_indexes():
+    _create_index("ix_students_advisor_id", "students", "advisor_id")
+    _create_index("ix_risk_scores_student_id_generated_at", "risk_scores", "student_id, generated_at DESC")
+    _create_index(
+        "ix_interventions_student_id_advisor_id_created_at",
+        "interventions",
+        "student_id, advisor_id, created_at DESC",
+    )
+    # (exam_id, student_id) lookups on student_responses are served by the uq_resp
+    # unique index (exam_id, student_id, question_id), so no extra index is needed.
+
+
+def _m003_advisor_data_version():
+    _add_column("advisors", "data_version", "INTEGER NOT NULL DEFAULT 0")
+
+
+def _m004_user_token_version():
+    _add_column("users", "token_version", "INTEGER NOT NULL DEFAULT 0")
+
+
+def _m005_risk_model_versions():
+    # model_versions itself is created by create_all
+    _add_column("risk_scores", "model_version_id", "INTEGER REFERENCES model_versions(id)")
+
+    # fold the per-row JSON copies into one version row per distinct value
+    legacy = db.session.execute(text(
+        "SELECT DISTINCT top_factors_json FROM risk_scores"
+        " WHERE top_factors_json IS NOT NULL AND model_version_id IS NULL"
+    )).scalars().all()
+    for payload in legacy:
+        bundle_hash = "legacy:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+        version_id = db.session.execute(
+            text("SELECT id FROM model_versions WHERE bundle_hash = :h"), {"h": bundle_hash}
+        ).scalar()
+        if version_id is None:
+            version_id = db.session.execute(
+                text(
+                    "INSERT INTO model_versions (bundle_hash, importances_json, created_at)"
+                    " VALUES (:h, :j, :t) RETURNING id"
+                ),
+                {"h": bundle_hash, "j": payload, "t": datetime.utcnow()},
+            ).scalar()
+        db.session.execute(
+            text(
+                "UPDATE risk_scores SET model_version_id = :v, top_factors_json = NULL"
+                " WHERE top_factors_json = :j AND model_version_id IS NULL"
+            ),
+            {"v": version_id, "j": payload},
+        )
+
+
+def _m006_risk_top_contributions():
+    blob = "BYTEA" if db.engine.dialect.name == "postgresql" else "BLOB"
+    _add_column("risk_scores", "top_contributions", blob)
+
+
+def _m007_incremental_scoring():
+    _add_column("students", "inputs_version", "INTEGER NOT NULL DEFAULT 0")
+    _add_column("risk_scores", "inputs_version", "INTEGER")
+    _add_column("prediction_jobs", "skipped", "INTEGER NOT NULL DEFAULT 0")
+    _add_column("prediction_jobs", "incremental", "BOOLEAN NOT NULL DEFAULT TRUE")
+
+
+MIGRATIONS = [
+    (1, "students.latest_risk_id pointer + backfill", _m001_latest_risk_pointer),
+    (2, "composite indexes for hot query shapes", _m002_hot_query_indexes),
+    (3, "advisors.data_version for conditional GET", _m003_advisor_data_version),
+    (4, "users.token_version for token revocation", _m004_user_token_version),
+    (5, "risk_scores.model_version_id + compact top_factors_json", _m005_risk_model_versions),
+    (6, "risk_scores.top_contributions (per-student factors)", _m006_risk_top_contributions),
+    (7, "inputs_version watermarks for incremental scoring", _m007_incremental_scoring),
+]
+
+
+def _ensure_version_table() -> None:
+    db.session.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " version INTEGER PRIMARY KEY,"
+        " description VARCHAR(255) NOT NULL,"
+        " applied_at TIMESTAMP NOT NULL)"
+    ))
+    db.session.commit()
+
+
+def applied_versions() -> set[int]:
+    _ensure_version_table()
+    return {v for (v,) in db.session.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def run_migrations() -> list[int]:
+    """
+    Applies pending migrations in order, each in its own transaction.
+    Safe to call on every startup; returns the versions applied now.
+    """
+    done = applied_versions()
+    applied = []
+    for version, description, fn in MIGRATIONS:
+        if version in done:
+            continue
+        try:
+            fn()
+            db.session.execute(
+                text("INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)"),
+                {"v": version, "d": description, "t": datetime.utcnow()},
+            )
+            db.session.commit()
+            applied.append(version)
+        except IntegrityError:
+            # another worker applied the same version concurrently (steps are idempotent)
+            db.session.rollback()
+        except Exception:
+            db.session.rollback()
+            raise
+    return applied
@@ -8,12 +8,20 @@ class User(db.Model):
     email = db.Column(db.String(255), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
     role = db.Column(db.String(20), nullable=False)  # 'student' or 'advisor'
+    # bumped on identity changes; tokens carrying an older value are rejected (services/principal.py)
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     student = db.relationship("Student", back_populates="user", uselist=False)
     advisor = db.relationship("Advisor", back_populates="user", uselist=False)
 
     def set_password(self, password: str) -> None:
         self.password_hash = generate_password_hash(password)
+        if self.id is not None:
+            # a changed password revokes the tokens issued with the old one (see services/principal.py)
+            from .services.principal import token_versions
+
+            self.token_version = (self.token_version or 0) + 1
+            token_versions.forget(self.id)
 
     def check_password(self, password: str) -> bool:
         return check_password_hash(self.password_hash, password)
@@ -23,6 +31,8 @@ class Advisor(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, unique=True)
     name = db.Column(db.String(120), nullable=False)
+    # bumped whenever scores/interventions of this advisor's students change (ETag token)
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     user = db.relationship("User", back_populates="advisor")
     students = db.relationship("Student", back_populates="advisor")
@@ -31,17 +41,44 @@ class Student(db.Model):
     __tablename__ = "students"
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, unique=True)
-    advisor_id = db.Column(db.Integer, db.ForeignKey("advisors.id"), nullable=False)
+    advisor_id = db.Column(db.Integer, db.ForeignKey("advisors.id"), nullable=False, index=True)
     name = db.Column(db.String(120), nullable=False)
     department = db.Column(db.String(120), nullable=True)
     cohort_year = db.Column(db.Integer, nullable=True)
+    # bumped whenever a scoring input changes (profile, responses, interventions): services/score_inputs.py
+    inputs_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    # Denormalized pointer to the newest RiskScore, maintained by the prediction writer
+    # (services/risk_writer.py) in the same transaction as the score itself.
+    latest_risk_id = db.Column(
+        db.Integer,
+        db.ForeignKey("risk_scores.id", use_alter=True, name="fk_students_latest_risk_id"),
+        nullable=True,
+    )
 
     user = db.relationship("User", back_populates="student")
     advisor = db.relationship("Advisor", back_populates="students")
 
-    risk_scores = db.relationship("RiskScore", back_populates="student", order_by="desc(RiskScore.generated_at)")
+    risk_scores = db.relationship(
+        "RiskScore",
+        back_populates="student",
+        foreign_keys="RiskScore.student_id",
+        order_by="desc(RiskScore.generated_at)",
+    )
+    latest_risk = db.relationship("RiskScore", foreign_keys=[latest_risk_id], post_update=True)
     interventions = db.relationship("Intervention", back_populates="student", order_by="desc(Intervention.created_at)")
 
+class ModelVersion(db.Model):
+    """One row per distinct model bundle that has produced scores (immutable)."""
+    __tablename__ = "model_versions"
+    id = db.Column(db.Integer, primary_key=True)
+    bundle_hash = db.Column(db.String(80), nullable=False, unique=True)  # sha256 of the bundle file
+    feature_columns_json = db.Column(db.Text, nullable=True)
+    threshold = db.Column(db.Float, nullable=True)
+    importances_json = db.Column(db.Text, nullable=True)  # [{"feature", "importance"}], descending
+    trained_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
 class RiskScore(db.Model):
     __tablename__ = "risk_scores"
     id = db.Column(db.Integer, primary_key=True)
@@ -49,10 +86,36 @@ class RiskScore(db.Model):
     generated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     risk_probability = db.Column(db.Float, nullable=False)
 
-    # store top feature importances as JSON (simple MVP XAI)
+    # model that produced the score; its global top factors live on the version row
+    model_version_id = db.Column(db.Integer, db.ForeignKey("model_versions.id"), nullable=True)
+    # Student.inputs_version the features were read at; older than the student's = stale score
+    inputs_version = db.Column(db.Integer, nullable=True)
+
+    # this student's top-k local factors: packed (int16 feature index, float32 contribution) pairs
+    top_contributions = db.Column(db.LargeBinary, nullable=True)
+
+    # legacy: per-row copy of the global importances (only on rows written before model_versions)
     top_factors_json = db.Column(db.Text, nullable=True)
 
-    student = db.relationship("Student", back_populates="risk_scores")
+    student = db.relationship("Student", back_populates="risk_scores", foreign_keys=[student_id])
+
+    __table_args__ = (
+        # latest score per student: WHERE student_id = ? ORDER BY generated_at DESC
+        db.Index("ix_risk_scores_student_id_generated_at", "student_id", db.text("generated_at DESC")),
+    )
+
+class RiskScoreAggregate(db.Model):
+    """Compacted risk history: one row per student and week (services/risk_history.py)."""
+    __tablename__ = "risk_score_aggregates"
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey("students.id"), nullable=False)
+    period_start = db.Column(db.DateTime, nullable=False)  # Monday 00:00 of the week
+    score_count = db.Column(db.Integer, nullable=False)
+    probability_sum = db.Column(db.Float, nullable=False)
+    probability_min = db.Column(db.Float, nullable=False)
+    probability_max = db.Column(db.Float, nullable=False)
+
+    __table_args__ = (db.UniqueConstraint("student_id", "period_start", name="uq_risk_agg_student_period"),)
 
 class Intervention(db.Model):
     __tablename__ = "interventions"
@@ -64,6 +127,16 @@ class Intervention(db.Model):
 
     student = db.relationship("Student", back_populates="interventions")
 
+    __table_args__ = (
+        # advisor detail: WHERE student_id = ? AND advisor_id = ? ORDER BY created_at DESC LIMIT 20
+        db.Index(
+            "ix_interventions_student_id_advisor_id_created_at",
+            "student_id",
+            "advisor_id",
+            db.text("created_at DESC"),
+        ),
+    )
+
 class Resource(db.Model):
     __tablename__ = "resources"
     id = db.Column(db.Integer, primary_key=True)
@@ -90,3 +163,29 @@ class StudentResponse(db.Model):
     is_correct = db.Column(db.Boolean, nullable=False)
 
     __table_args__ = (db.UniqueConstraint("exam_id", "student_id", "question_id", name="uq_resp"),)
+
+class PredictionJob(db.Model):
+    __tablename__ = "prediction_jobs"
+    id = db.Column(db.Integer, primary_key=True)
+    advisor_id = db.Column(db.Integer, db.ForeignKey("advisors.id"), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default="queued")  # queued / running / succeeded / failed
+
+    total = db.Column(db.Integer, nullable=True)
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    created = db.Column(db.Integer, nullable=False, default=0)
+    updated = db.Column(db.Integer, nullable=False, default=0)
+    skipped = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # scores already current
+    incremental = db.Column(db.Boolean, nullable=False, default=True, server_default=db.true())
+    error = db.Column(db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    # heartbeat: refreshed on every progress update, used to detect jobs orphaned by a restart
+    heartbeat_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+class CacheVersion(db.Model):
+    """Named invalidation counters for per-process caches (e.g. 'catalog')."""
+    __tablename__ = "cache_versions"
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
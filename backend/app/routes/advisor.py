@@ -1,11 +1,25 @@
+import base64
+import csv
+import io
 import json
-from flask import Blueprint, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import func, and_
+from concurrent.futures import TimeoutError as FutureTimeout
+from datetime import datetime, timedelta
+from flask import Blueprint, current_app, g, request
+from flask_jwt_extended import jwt_required
+from sqlalchemy import and_, or_
 
 from .. import db
-from ..models import Advisor, Student, RiskScore, Intervention
-from ..services.predict import run_batch_risk_prediction
+from ..models import Student, RiskScore, Intervention, PredictionJob
+from ..services.response_cache import bump_advisor_versions, cached_advisor_response
+from ..services.mastery import build_mastery_matrix
+from ..services.online_scoring import ModelUnavailable, parse_instances, score_instances
+from ..services.jobs import JobQueueFull, job_payload, poll_job_payload, submit_prediction_job
+from ..services.ingest import ingest_responses, read_records
+from ..services.model_versions import model_versions
+from ..services.contributions import unpack as unpack_contributions
+from ..services.request_timing import query_budget
+from ..services.risk_history import BUCKETS, risk_trend
+from ..services.score_inputs import mark_inputs_changed
 from .guards import advisor_required
 
 bp = Blueprint("advisor", __name__)
@@ -13,88 +27,152 @@ bp = Blueprint("advisor", __name__)
 # -----------------------
 # Helpers
 # -----------------------
-def _advisor_from_token():
-    user_id = int(get_jwt_identity())
-    return Advisor.query.filter_by(user_id=user_id).first()
-
-def _latest_risk_map(student_ids):
-    """Return {student_id: latest RiskScore} in ONE query (no N+1)."""
-    if not student_ids:
-        return {}
-
-    subq = (
+def _advisor_id_from_token():
+    # resolved from the signed claims by advisor_required (no query)
+    return g.principal.advisor_id
+
+RISK_LIST_DEFAULT_LIMIT = 50
+RISK_LIST_MAX_LIMIT = 500
+RISK_TREND_DEFAULT_DAYS = 365
+
+def _encode_cursor(risk, student_id) -> str:
+    raw = json.dumps([risk, student_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str):
+    """Returns (risk or None, student_id); raises ValueError on a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        risk, student_id = json.loads(raw)
+        return (None if risk is None else float(risk)), int(student_id)
+    except Exception as exc:
+        raise ValueError("invalid cursor") from exc
+
+def _risk_list_query(advisor_id, min_risk=None, department=None, cohort_year=None, after=None):
+    """
+    Students + latest risk in ONE indexed join via Student.latest_risk_id,
+    ordered in SQL: risk DESC NULLS LAST, then student id (stable tie-break).
+    after=(risk, id) continues strictly after that row (keyset pagination).
+    """
+    risk = RiskScore.risk_probability
+    q = (
         db.session.query(
-            RiskScore.student_id.label("student_id"),
-            func.max(RiskScore.generated_at).label("max_gen"),
+            Student.id,
+            Student.name,
+            Student.department,
+            risk,
+            RiskScore.generated_at,
         )
-        .filter(RiskScore.student_id.in_(student_ids))
-        .group_by(RiskScore.student_id)
-        .subquery()
+        .outerjoin(RiskScore, RiskScore.id == Student.latest_risk_id)
+        .filter(Student.advisor_id == advisor_id)
     )
 
-    latest_scores = (
-        db.session.query(RiskScore)
-        .join(
-            subq,
-            and_(
-                RiskScore.student_id == subq.c.student_id,
-                RiskScore.generated_at == subq.c.max_gen,
-            ),
-        )
-        .all()
-    )
-
-    return {rs.student_id: rs for rs in latest_scores}
+    if min_risk is not None:
+        q = q.filter(risk >= min_risk)
+    if department:
+        q = q.filter(Student.department == department)
+    if cohort_year is not None:
+        q = q.filter(Student.cohort_year == cohort_year)
+
+    if after is not None:
+        after_risk, after_id = after
+        if after_risk is None:
+            q = q.filter(risk.is_(None), Student.id > after_id)
+        else:
+            q = q.filter(or_(
+                risk < after_risk,
+                and_(risk == after_risk, Student.id > after_id),
+                risk.is_(None),
+            ))
+
+    return q.order_by(risk.desc().nulls_last(), Student.id.asc())
+
+def _student_rows_payload(rows):
+    return [
+        {
+            "student_id": sid,
+            "name": name,
+            "department": department,
+            "risk_probability": float(prob) if prob is not None else None,
+            "risk_generated_at": generated_at.isoformat() if generated_at else None,
+        }
+        for sid, name, department, prob, generated_at in rows
+    ]
 
 def _students_payload_for_advisor(advisor_id):
-    students = Student.query.filter_by(advisor_id=advisor_id).all()
-    ids = [s.id for s in students]
-    latest_map = _latest_risk_map(ids)
-
-    out = []
-    for s in students:
-        latest = latest_map.get(s.id)
-        out.append({
-            "student_id": s.id,
-            "name": s.name,
-            "department": s.department,
-            "risk_probability": float(latest.risk_probability) if latest else None,
-            "risk_generated_at": latest.generated_at.isoformat() if latest else None,
-        })
-
-    # None last, high risk first
-    out.sort(key=lambda x: (x["risk_probability"] is None, -(x["risk_probability"] or -1)))
-    return out
+    # None last, high risk first (sorted in SQL)
+    return _student_rows_payload(_risk_list_query(advisor_id).all())
 
 # -----------------------
 # Contract endpoint
 # GET /api/advisor/risk-list
+#   ?limit=50&cursor=<next_cursor>&min_risk=0.5&department=CENG&cohort_year=2023
 # -----------------------
 @bp.get("/advisor/risk-list")
+@query_budget(2)
 @jwt_required()
 @advisor_required
 def advisor_risk_list():
-    advisor = _advisor_from_token()
-    if not advisor:
+    advisor_id = _advisor_id_from_token()
+    if not advisor_id:
         return {"error": "Advisor profile missing"}, 404
 
-    students = _students_payload_for_advisor(advisor.id)
-    return {"students": students}, 200
+    args = request.args
+    limit = args.get("limit", type=int) if "limit" in args else RISK_LIST_DEFAULT_LIMIT
+    if limit is None or limit < 1:
+        return {"error": "limit must be a positive integer"}, 400
+    limit = min(limit, RISK_LIST_MAX_LIMIT)
+
+    min_risk = args.get("min_risk", type=float)
+    if "min_risk" in args and min_risk is None:
+        return {"error": "min_risk must be a number"}, 400
+    cohort_year = args.get("cohort_year", type=int)
+    if "cohort_year" in args and cohort_year is None:
+        return {"error": "cohort_year must be an integer"}, 400
+
+    after = None
+    if args.get("cursor"):
+        try:
+            after = _decode_cursor(args["cursor"])
+        except ValueError:
+            return {"error": "Invalid cursor"}, 400
+
+    def build():
+        rows = _risk_list_query(
+            advisor_id,
+            min_risk=min_risk,
+            department=(args.get("department") or "").strip() or None,
+            cohort_year=cohort_year,
+            after=after,
+        ).limit(limit + 1).all()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            next_cursor = _encode_cursor(float(last[3]) if last[3] is not None else None, last[0])
+
+        return {"students": _student_rows_payload(rows), "next_cursor": next_cursor}, 200
+
+    return cached_advisor_response(advisor_id, build)
 
 # -----------------------
 # Keep existing endpoint
 # GET /api/advisor/students
 # -----------------------
 @bp.get("/advisor/students")
+@query_budget(2)
 @jwt_required()
 @advisor_required
 def advisor_students():
-    advisor = _advisor_from_token()
-    if not advisor:
+    advisor_id = _advisor_id_from_token()
+    if not advisor_id:
         return {"error": "Advisor profile missing"}, 404
 
-    students = _students_payload_for_advisor(advisor.id)
-    return {"students": students}, 200
+    return cached_advisor_response(
+        advisor_id, lambda: ({"students": _students_payload_for_advisor(advisor_id)}, 200)
+    )
 
 # -----------------------
 # Alias: /advisor/student/<id>
@@ -109,58 +187,115 @@ def advisor_student_alias(student_id: int):
 # GET /api/advisor/students/<id>
 # -----------------------
 @bp.get("/advisor/students/<int:student_id>")
+@query_budget(4)  # +1 the first time this process sees a model version
 @jwt_required()
 @advisor_required
 def advisor_student_detail(student_id: int):
-    advisor = _advisor_from_token()
-    if not advisor:
+    advisor_id = _advisor_id_from_token()
+    if not advisor_id:
         return {"error": "Advisor profile missing"}, 404
 
-    student = db.session.get(Student, student_id)
-    if not student or student.advisor_id != advisor.id:
-        return {"error": "Student not found"}, 404
+    def build():
+        row = (
+            db.session.query(Student, RiskScore)
+            .outerjoin(RiskScore, RiskScore.id == Student.latest_risk_id)
+            .filter(Student.id == student_id)
+            .first()
+        )
+        student, latest = row if row else (None, None)
+        if not student or student.advisor_id != advisor_id:
+            return {"error": "Student not found"}, 404
+
+        interventions = (
+            Intervention.query
+            .filter_by(student_id=student.id, advisor_id=advisor_id)
+            .order_by(Intervention.created_at.desc())
+            .limit(20)
+            .all()
+        )
 
-    latest = (
-        RiskScore.query
-        .filter_by(student_id=student.id)
-        .order_by(RiskScore.generated_at.desc())
-        .first()
-    )
+        interventions_payload = [
+            {"id": i.id, "note": i.note, "created_at": i.created_at.isoformat()}
+            for i in interventions
+        ]
+
+        xai = local = None
+        version = model_versions.get(latest.model_version_id) if latest else None
+        if version is not None:
+            xai = version["top_factors"]
+            local = unpack_contributions(latest.top_contributions, version["feature_columns"])
+        elif latest and latest.top_factors_json:
+            try:
+                xai = json.loads(latest.top_factors_json)
+            except Exception:
+                xai = None
+
+        return {
+            "student": {
+                "student_id": student.id,
+                "name": student.name,
+                "department": student.department,
+                "cohort_year": student.cohort_year,
+            },
+            "latest_risk": {
+                "risk_probability": float(latest.risk_probability) if latest else None,
+                "generated_at": latest.generated_at.isoformat() if latest else None,
+                "top_factors": xai,
+                "local_factors": local,
+                "model_version_id": latest.model_version_id if latest else None,
+            },
+            "interventions": interventions_payload,
+        }, 200
+
+    return cached_advisor_response(advisor_id, build)
 
-    interventions = (
-        Intervention.query
-        .filter_by(student_id=student.id, advisor_id=advisor.id)
-        .order_by(Intervention.created_at.desc())
-        .limit(20)
-        .all()
-    )
+# -----------------------
+# GET /api/advisor/students/<id>/risk-trend?bucket=week&days=365
+# risk history averaged per day / week / month (bucketed in SQL)
+# -----------------------
+@bp.get("/advisor/students/<int:student_id>/risk-trend")
+@query_budget(4)  # data version, owner, raw + compacted trend (token check is exempt)
+@jwt_required()
+@advisor_required
+def advisor_student_risk_trend(student_id: int):
+    advisor_id = _advisor_id_from_token()
+    if not advisor_id:
+        return {"error": "Advisor profile missing"}, 404
 
-    interventions_payload = [
-        {"id": i.id, "note": i.note, "created_at": i.created_at.isoformat()}
-        for i in interventions
-    ]
+    bucket = request.args.get("bucket", "week")
+    if bucket not in BUCKETS:
+        return {"error": f"bucket must be one of {', '.join(BUCKETS)}"}, 400
+    days = request.args.get("days", RISK_TREND_DEFAULT_DAYS, type=int)
+    if days is None or days < 1:
+        return {"error": "days must be a positive integer"}, 400
+
+    def build():
+        owner = db.session.query(Student.advisor_id).filter_by(id=student_id).scalar()
+        if owner != advisor_id:
+            return {"error": "Student not found"}, 404
+        since = datetime.utcnow() - timedelta(days=days)
+        return {
+            "student_id": student_id,
+            "bucket": bucket,
+            "points": risk_trend(student_id, bucket=bucket, since=since),
+        }, 200
+
+    return cached_advisor_response(advisor_id, build)
 
-    xai = None
-    if latest and latest.top_factors_json:
-        try:
-            xai = json.loads(latest.top_factors_json)
-        except Exception:
-            xai = None
+# -----------------------
+# GET /api/advisor/exams/<exam_id>/mastery
+# students x topics mastery matrix for all of the advisor's students
+# -----------------------
+@bp.get("/advisor/exams/<int:exam_id>/mastery")
+@query_budget(1)
+@jwt_required()
+@advisor_required
+def advisor_exam_mastery(exam_id: int):
+    advisor_id = _advisor_id_from_token()
+    if not advisor_id:
+        return {"error": "Advisor profile missing"}, 404
 
-    return {
-        "student": {
-            "student_id": student.id,
-            "name": student.name,
-            "department": student.department,
-            "cohort_year": student.cohort_year,
-        },
-        "latest_risk": {
-            "risk_probability": float(latest.risk_probability) if latest else None,
-            "generated_at": latest.generated_at.isoformat() if latest else None,
-            "top_factors": xai,
-        },
-        "interventions": interventions_payload,
-    }, 200
+    return build_mastery_matrix(advisor_id, exam_id), 200
 
 # -----------------------
 # POST /api/advisor/interventions
@@ -170,8 +305,8 @@ def advisor_student_detail(student_id: int):
 @jwt_required()
 @advisor_required
 def create_intervention_contract():
-    advisor = _advisor_from_token()
-    if not advisor:
+    advisor_id = _advisor_id_from_token()
+    if not advisor_id:
         return {"error": "Advisor profile missing"}, 404
 
     data = request.get_json(silent=True) or {}
@@ -184,11 +319,13 @@ def create_intervention_contract():
         return {"error": "note is required"}, 400
 
     student = db.session.get(Student, int(student_id))
-    if not student or student.advisor_id != advisor.id:
+    if not student or student.advisor_id != advisor_id:
         return {"error": "Student not found"}, 404
 
-    inter = Intervention(advisor_id=advisor.id, student_id=student.id, note=note)
+    inter = Intervention(advisor_id=advisor_id, student_id=student.id, note=note)
     db.session.add(inter)
+    bump_advisor_versions(advisor_ids=[advisor_id])
+    mark_inputs_changed([student.id])
     db.session.commit()
 
     return {
@@ -209,12 +346,12 @@ def create_intervention_contract():
 @jwt_required()
 @advisor_required
 def add_intervention(student_id: int):
-    advisor = _advisor_from_token()
-    if not advisor:
+    advisor_id = _advisor_id_from_token()
+    if not advisor_id:
         return {"error": "Advisor profile missing"}, 404
 
     student = db.session.get(Student, student_id)
-    if not student or student.advisor_id != advisor.id:
+    if not student or student.advisor_id != advisor_id:
         return {"error": "Student not found"}, 404
 
     data = request.get_json(silent=True) or {}
@@ -222,22 +359,148 @@ def add_intervention(student_id: int):
     if not note:
         return {"error": "note is required"}, 400
 
-    inter = Intervention(advisor_id=advisor.id, student_id=student.id, note=note)
+    inter = Intervention(advisor_id=advisor_id, student_id=student.id, note=note)
     db.session.add(inter)
+    bump_advisor_versions(advisor_ids=[advisor_id])
+    mark_inputs_changed([student.id])
     db.session.commit()
 
     return {"ok": True, "id": inter.id}, 201
 
 # -----------------------
 # POST /api/advisor/predict-risk
+# Enqueues a background scoring job and returns its id right away (202).
+# Only students whose inputs or model changed are re-scored; body {"full": true} forces all.
 # -----------------------
 @bp.post("/advisor/predict-risk")
 @jwt_required()
 @advisor_required
 def trigger_predict():
-    advisor = _advisor_from_token()
-    if not advisor:
+    advisor_id = _advisor_id_from_token()
+    if not advisor_id:
         return {"error": "Advisor profile missing"}, 404
 
-    created = run_batch_risk_prediction(student_ids=[s.id for s in advisor.students])
-    return {"ok": True, "generated": created}, 200
+    data = request.get_json(silent=True) or {}
+    try:
+        job, created = submit_prediction_job(advisor_id, incremental=not data.get("full"))
+    except JobQueueFull:
+        return {"error": "Too many prediction jobs queued, try again later"}, 503
+
+    return {"ok": True, "deduplicated": not created, **job_payload(job)}, 202
+
+# -----------------------
+# GET /api/advisor/predict-risk/<job_id>
+# An active job without a heartbeat for PREDICTION_JOB_STALE_SECONDS (its worker
+# died) is marked failed here, so pollers stop waiting.
+# -----------------------
+@bp.get("/advisor/predict-risk/<int:job_id>")
+@query_budget(2)  # +1 when an orphaned job is marked failed
+@jwt_required()
+@advisor_required
+def predict_job_status(job_id: int):
+    advisor_id = _advisor_id_from_token()
+    if not advisor_id:
+        return {"error": "Advisor profile missing"}, 404
+
+    job = db.session.get(PredictionJob, job_id)
+    if not job or job.advisor_id != advisor_id:
+        return {"error": "Job not found"}, 404
+
+    return poll_job_payload(job), 200
+
+# -----------------------
+# POST /api/advisor/score
+# body: {"instances": [{"student_id": 12, "features": {"Curricular units 1st sem (grade)": 14}}, {"features": {...}}]}
+# What-if scoring, nothing is stored. An instance with a student_id starts from the
+# student's current features; "features" override them (unknown names are rejected).
+# Concurrent requests are coalesced into shared model calls (see online_scoring.py).
+# -----------------------
+@bp.post("/advisor/score")
+@query_budget(5)  # ownership, model version (cold cache), 3 feature-signal queries
+@jwt_required()
+@advisor_required
+def score_what_if():
+    advisor_id = _advisor_id_from_token()
+    if not advisor_id:
+        return {"error": "Advisor profile missing"}, 404
+
+    data = request.get_json(silent=True) or {}
+    try:
+        parsed = parse_instances(data.get("instances"))
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    if len(parsed) > current_app.config.get("SCORE_MAX_INSTANCES", 1000):
+        return {"error": f"At most {current_app.config.get('SCORE_MAX_INSTANCES', 1000)} instances per request"}, 400
+
+    student_ids = {sid for sid, _ in parsed if sid is not None}
+    if student_ids:
+        own = {
+            sid for (sid,) in db.session.query(Student.id)
+            .filter(Student.id.in_(student_ids), Student.advisor_id == advisor_id)
+        }
+        if own != student_ids:
+            return {"error": "Student not found"}, 404
+
+    try:
+        result = score_instances(parsed)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    except ModelUnavailable:
+        return {"error": "No trained model available"}, 503
+    except FutureTimeout:
+        return {"error": "Scoring timed out, try again later"}, 503
+
+    return result, 200
+
+# -----------------------
+# POST /api/advisor/ingest/responses
+# body: raw CSV (Content-Type: text/csv) or NDJSON (application/x-ndjson),
+#       or a multipart upload in field "file" (format from the filename)
+# query: ?chunk_size=5000
+# Responses are only accepted for the advisor's own students. Chunks are committed
+# one by one; on unreadable input the 400 reports what was already committed.
+# Blueprints are shared by every exam and are loaded with scripts/ingest.py only.
+# -----------------------
+INGEST_FORMATS = {"text/csv": "csv", "application/x-ndjson": "ndjson", "application/jsonl": "ndjson"}
+
+@bp.post("/advisor/ingest/<kind>")
+@jwt_required()
+@advisor_required
+def ingest(kind: str):
+    advisor_id = _advisor_id_from_token()
+    if not advisor_id:
+        return {"error": "Advisor profile missing"}, 404
+    if kind == "blueprints":
+        return {"error": "Blueprints are loaded with scripts/ingest.py"}, 403
+    if kind != "responses":
+        return {"error": "kind must be 'responses'"}, 400
+
+    upload = request.files.get("file")
+    if upload is not None:
+        fmt = upload.filename.rsplit(".", 1)[-1].lower() if "." in (upload.filename or "") else ""
+        stream = upload.stream
+    else:
+        fmt = INGEST_FORMATS.get(request.mimetype, "")
+        stream = request.stream
+    if fmt not in ("csv", "ndjson", "jsonl"):
+        return {"error": "Send text/csv or application/x-ndjson"}, 415
+
+    try:
+        chunk_size = int(request.args.get("chunk_size", 5000))
+    except ValueError:
+        return {"error": "chunk_size must be an integer"}, 400
+
+    # streamed: the body is decoded and parsed chunk by chunk, never held in memory
+    records = read_records(io.TextIOWrapper(stream, encoding="utf-8", newline=""), fmt)
+    committed = {"written": 0, "chunks": 0}
+
+    def progress(p: dict) -> None:
+        committed.update(written=p["written"], chunks=p["chunks"])
+
+    try:
+        result = ingest_responses(records, chunk_size=chunk_size, advisor_id=advisor_id, progress=progress)
+    except (ValueError, UnicodeDecodeError, OverflowError, csv.Error) as e:
+        db.session.rollback()
+        return {"error": f"Unreadable input: {e}", "committed": committed}, 400
+
+    return {"ok": True, "kind": kind, **result}, 200
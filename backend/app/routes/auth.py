@@ -1,45 +1,62 @@
-from flask import Blueprint, request
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
+from flask import Blueprint, g, request
+from flask_jwt_extended import create_access_token, jwt_required
+from sqlalchemy.orm import joinedload
+from .. import db
 from ..models import User
+from ..services.principal import bump_token_version, identity_claims
+from ..services.request_timing import query_budget
+from .guards import login_required
 
 bp = Blueprint("auth", __name__)
 
 @bp.post("/login")
+@query_budget(1)
 def login():
     data = request.get_json(force=True) or {}
     email = (data.get("email") or "").strip().lower()
     password = data.get("password") or ""
 
-    user = User.query.filter_by(email=email).first()
+    # profile ids go into the token, so load them with the user (one query)
+    user = (
+        User.query.options(joinedload(User.student), joinedload(User.advisor))
+        .filter_by(email=email)
+        .first()
+    )
     if not user or not user.check_password(password):
         return {"error": "Invalid email or password"}, 401
 
     access_token = create_access_token(
         identity=str(user.id),
-        additional_claims={"role": user.role}
+        additional_claims=identity_claims(user)
     )
     return {"access_token": access_token, "role": user.role}, 200
 
 
-@bp.get("/me")
+@bp.post("/logout")
+@query_budget(1)
 @jwt_required()
-def me():
-    user_id = int(get_jwt_identity())
-    claims = get_jwt()
-    role = claims.get("role")
+@login_required
+def logout():
+    # tokens are stateless: revoking by version signs the user out of every session
+    bump_token_version(g.principal.user_id)
+    db.session.commit()
+    return {"ok": True}, 200
 
-    user = User.query.get(user_id)
-    if not user:
-        return {"error": "User not found"}, 404
 
-    payload = {"id": user.id, "email": user.email, "role": role}
+@bp.get("/me")
+@query_budget(0)
+@jwt_required()
+@login_required
+def me():
+    principal = g.principal
+    payload = {"id": principal.user_id, "email": principal.email, "role": principal.role}
 
-    if role == "student" and getattr(user, "student", None):
-        payload["student_id"] = user.student.id
-        payload["name"] = user.student.name
+    if principal.role == "student" and principal.student_id:
+        payload["student_id"] = principal.student_id
+        payload["name"] = principal.name
 
-    if role == "advisor" and getattr(user, "advisor", None):
-        payload["advisor_id"] = user.advisor.id
-        payload["name"] = user.advisor.name
+    if principal.role == "advisor" and principal.advisor_id:
+        payload["advisor_id"] = principal.advisor_id
+        payload["name"] = principal.name
 
     return payload, 200
@@ -1,10 +1,23 @@
 from functools import wraps
+from flask import g
 from flask_jwt_extended import verify_jwt_in_request, get_jwt, get_jwt_identity
 
-def role_required(required_role: str):
+from ..services.principal import resolve_principal
+from ..services.request_timing import budget_exempt
+
+def _load_principal():
+    """Resolves the caller from the token claims into g.principal (None if revoked)."""
+    # token_version lookup on a cold cache: not part of any view's query budget
+    with budget_exempt():
+        principal = resolve_principal(get_jwt_identity(), get_jwt())
+    g.principal = principal
+    return principal
+
+def role_required(required_role: str | None):
     """
-    Enforces JWT + role check. Use as decorator:
+    Enforces JWT + role check and sets g.principal. Use as decorator:
     @role_required("advisor") or @role_required("student")
+    (role None: any authenticated user)
     """
     def decorator(fn):
         @wraps(fn)
@@ -12,14 +25,15 @@ def role_required(required_role: str):
             verify_jwt_in_request()
             claims = get_jwt()
             role = claims.get("role")
-            if role != required_role:
+            if required_role is not None and role != required_role:
                 return {"error": "Forbidden"}, 403
 
-            # keep for convenience if you want later
-            _ = get_jwt_identity()
+            if _load_principal() is None:
+                return {"error": "Token revoked"}, 401
             return fn(*args, **kwargs)
         return wrapper
     return decorator
 
 advisor_required = role_required("advisor")
 student_required = role_required("student")
+login_required = role_required(None)
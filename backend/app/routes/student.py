@@ -1,44 +1,48 @@
-from flask import Blueprint, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, g, request
+from flask_jwt_extended import jwt_required
 
+from .. import db
 from ..models import Student, RiskScore
 from ..services.study_planner import build_study_plan_for_student
+from ..services.request_timing import query_budget
 from .guards import student_required
 
 bp = Blueprint("student", __name__)
 
-def _student_from_token():
-    user_id = int(get_jwt_identity())
-    student = Student.query.filter_by(user_id=user_id).first()
-    return student
+def _student_id_from_token():
+    # resolved from the signed claims by student_required (no query)
+    return g.principal.student_id
 
-def _latest_risk(student_id: int):
+def _latest_risk(student_id):
+    # one join through the denormalized pointer
     return (
-        RiskScore.query
-        .filter_by(student_id=student_id)
-        .order_by(RiskScore.generated_at.desc())
+        db.session.query(RiskScore)
+        .join(Student, Student.latest_risk_id == RiskScore.id)
+        .filter(Student.id == student_id)
         .first()
     )
 
 # NEW: contract alias
 @bp.get("/student/dashboard")
+@query_budget(1)
 @jwt_required()
 @student_required
 def student_dashboard():
     return student_progress()
 
 @bp.get("/student/progress")
+@query_budget(1)
 @jwt_required()
 @student_required
 def student_progress():
-    student = _student_from_token()
-    if not student:
+    student_id = _student_id_from_token()
+    if not student_id:
         return {"error": "Student profile missing"}, 404
 
-    latest = _latest_risk(student.id)
+    latest = _latest_risk(student_id)
 
     return {
-        "student": {"student_id": student.id, "name": student.name},
+        "student": {"student_id": student_id, "name": g.principal.name},
         "latest_update": latest.generated_at.isoformat() if latest else None,
         "latest_risk": float(latest.risk_probability) if latest else None,
         "progress": {
@@ -50,18 +54,21 @@ def student_progress():
 
 
 @bp.get("/student/study-plan")
+@query_budget(4)
 @jwt_required()
 @student_required
 def student_study_plan():
-    student = _student_from_token()
-    if not student:
+    student_id = _student_id_from_token()
+    if not student_id:
         return {"error": "Student profile missing"}, 404
 
     exam_id = request.args.get("exam_id", type=int)
     if not exam_id:
         return {"error": "exam_id is required"}, 400
 
-    plan = build_study_plan_for_student(student_id=student.id, exam_id=exam_id)
+    plan = build_study_plan_for_student(student_id=student_id, exam_id=exam_id)
+    if isinstance(plan, tuple):  # (error payload, status)
+        return plan
     return plan, 200
 
 
@@ -70,8 +77,8 @@ def student_study_plan():
 @jwt_required()
 @student_required
 def study_plan_feedback():
-    student = _student_from_token()
-    if not student:
+    student_id = _student_id_from_token()
+    if not student_id:
         return {"error": "Student profile missing"}, 404
 
     data = request.get_json(force=True) or {}
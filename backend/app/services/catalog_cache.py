@@ -0,0 +1,207 @@
+"""
+Per-process cache for the exam blueprint and resource catalog.
+
+Blueprints and resources almost never change during a term, so each worker
+keeps:
+  - exam_id   -> BlueprintMap (sorted int32 question ids + int16 topic codes,
+                 topic strings interned)
+  - topic_tag -> ranked top-N resources (tuples)
+in one LRU bounded by a total row budget (CATALOG_CACHE_MAX_ROWS).
+
+Invalidation: writers of ExamBlueprint / Resource call bump_catalog_version()
+in their transaction. Workers re-read the 'catalog' counter from
+cache_versions at most every CATALOG_VERSION_CHECK_SECONDS and drop
+everything when it moved; a bump in this process takes effect immediately.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from sqlalchemy import func, update
+
+from .. import db
+from ..models import CacheVersion, ExamBlueprint, Resource
+
+CATALOG_VERSION_NAME = "catalog"
+RESOURCES_PER_TOPIC = 5
+UNKNOWN_TOPIC = "Unknown"
+
+
+class BlueprintMap:
+    """question_id -> topic for one exam, array-backed."""
+
+    __slots__ = ("question_ids", "topic_codes", "topics")
+
+    def __init__(self, rows):
+        rows = sorted(rows)  # (question_id, topic_tag)
+        topics: list[str] = []
+        code_of: dict[str, int] = {}
+        codes = []
+        for _, topic in rows:
+            if topic not in code_of:
+                code_of[topic] = len(topics)
+                topics.append(sys.intern(topic))
+            codes.append(code_of[topic])
+        self.question_ids = np.fromiter((q for q, _ in rows), dtype=np.int32, count=len(rows))
+        self.topic_codes = np.asarray(codes, dtype=np.int16)
+        self.topics = tuple(topics)
+
+    def __len__(self) -> int:
+        return len(self.question_ids)
+
+    def codes_for(self, question_ids: np.ndarray) -> np.ndarray:
+        """Topic code per question id; -1 for questions not in the blueprint."""
+        if len(self.question_ids) == 0:
+            return np.full(len(question_ids), -1, dtype=np.int16)
+        pos = np.searchsorted(self.question_ids, question_ids)
+        pos = np.minimum(pos, len(self.question_ids) - 1)
+        found = self.question_ids[pos] == question_ids
+        return np.where(found, self.topic_codes[pos], -1).astype(np.int16)
+
+
+class CatalogCache:
+    def __init__(self, max_rows: int = 200_000, check_interval: float = 2.0):
+        self.max_rows = max_rows
+        self.check_interval = check_interval
+        self._data: OrderedDict[tuple, tuple[object, int]] = OrderedDict()  # key -> (value, cost)
+        self._rows = 0
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    # --- versioning ---
+    def _sync_version(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        version = db.session.query(CacheVersion.version).filter_by(name=CATALOG_VERSION_NAME).scalar() or 0
+        self._checked_at = now
+        if version != self._version:
+            if self._version is not None:
+                self.clear()
+            self._version = version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._rows = 0
+            self.invalidations += 1
+
+    def force_recheck(self) -> None:
+        self._checked_at = 0.0
+
+    # --- LRU ---
+    def _get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def _put(self, key, value, cost: int) -> None:
+        cost = max(1, cost)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._rows -= old[1]
+            self._data[key] = (value, cost)
+            self._rows += cost
+            while self._rows > self.max_rows and len(self._data) > 1:
+                _, (_, evicted_cost) = self._data.popitem(last=False)
+                self._rows -= evicted_cost
+
+    # --- public API ---
+    def blueprint(self, exam_id: int) -> BlueprintMap:
+        self._sync_version()
+        key = ("blueprint", exam_id)
+        bp = self._get(key)
+        if bp is None:
+            rows = (
+                db.session.query(ExamBlueprint.question_id, ExamBlueprint.topic_tag)
+                .filter_by(exam_id=exam_id)
+                .all()
+            )
+            bp = BlueprintMap(rows)
+            self._put(key, bp, len(bp))
+        return bp
+
+    def resources(self, topics: list[str], per_topic: int = RESOURCES_PER_TOPIC) -> dict[str, tuple]:
+        """Ranked resources per topic; missing topics are fetched in ONE windowed query."""
+        self._sync_version()
+        out: dict[str, tuple] = {}
+        missing = []
+        for t in topics:
+            cached = self._get(("resources", t, per_topic))
+            if cached is None:
+                missing.append(t)
+            else:
+                out[t] = cached
+
+        if missing:
+            fetched: dict[str, list] = {t: [] for t in missing}
+            rn = func.row_number().over(partition_by=Resource.topic_tag, order_by=Resource.id).label("rn")
+            ranked = (
+                db.session.query(Resource.topic_tag, Resource.title, Resource.url, Resource.type, rn)
+                .filter(Resource.topic_tag.in_(missing))
+                .subquery()
+            )
+            rows = (
+                db.session.query(ranked.c.topic_tag, ranked.c.title, ranked.c.url, ranked.c.type)
+                .filter(ranked.c.rn <= per_topic)
+                .order_by(ranked.c.topic_tag, ranked.c.rn)
+                .all()
+            )
+            for topic_tag, title, url, typ in rows:
+                fetched[topic_tag].append((title, url, typ))
+            for t, items in fetched.items():
+                value = tuple(items)
+                self._put(("resources", sys.intern(t), per_topic), value, len(value))
+                out[t] = value
+
+        return out
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "rows": self._rows,
+            "max_rows": self.max_rows,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else None,
+            "invalidations": self.invalidations,
+            "version": self._version,
+        }
+
+
+catalog_cache = CatalogCache()
+
+
+def configure_catalog_cache(app) -> None:
+    catalog_cache.max_rows = int(app.config.get("CATALOG_CACHE_MAX_ROWS", catalog_cache.max_rows))
+    catalog_cache.check_interval = float(app.config.get("CATALOG_VERSION_CHECK_SECONDS", catalog_cache.check_interval))
+
+
+def bump_catalog_version() -> None:
+    """
+    Call from any write to ExamBlueprint / Resource (same transaction; does NOT commit).
+    Other workers notice within CATALOG_VERSION_CHECK_SECONDS.
+    """
+    updated = db.session.execute(
+        update(CacheVersion)
+        .where(CacheVersion.name == CATALOG_VERSION_NAME)
+        .values(version=CacheVersion.version + 1),
+        execution_options={"synchronize_session": False},
+    ).rowcount
+    if not updated:
+        db.session.add(CacheVersion(name=CATALOG_VERSION_NAME, version=1))
+    catalog_cache.clear()
+    catalog_cache.force_recheck()
@@ -0,0 +1,88 @@
+"""
+Per-student explanations from LightGBM feature contributions.
+
+predict(X, pred_contrib=True) returns, per row, one SHAP-style log-odds
+contribution per feature plus the expected value. It runs TreeSHAP, which
+costs far more than a plain predict (about 60x on the shipped 800-tree
+bundle), so probabilities come from Booster.predict and contributions from a
+separate pass over the rows that get explained: RISK_CONTRIBUTIONS=at_risk
+(default, rows at or above the bundle threshold), all, or off. Only LightGBM
+models support it; other bundles store no explanations.
+
+Only the top-k features by absolute contribution are kept, stored per
+RiskScore as k packed (int16 feature index, float32 value) pairs = 6 bytes
+each. Rows without an explanation carry feature index -1 and are stored as
+NULL. Feature names come from the row's model version
+(model_versions.feature_columns_json).
+"""
+import numpy as np
+
+TOP_K = 6
+PACKED = np.dtype([("feature", "<i2"), ("value", "<f4")])
+CONTRIBUTION_MODES = ("at_risk", "all", "off")
+
+
+def supports_contributions(model) -> bool:
+    """True for a LightGBM Booster or LightGBM sklearn estimator (same test as compiled_scorer)."""
+    return hasattr(getattr(model, "booster_", model), "pandas_categorical")
+
+
+def contributions(model, X) -> np.ndarray:
+    """contributions[n, n_features] from one pred_contrib pass; binary LightGBM models only."""
+    contrib = np.asarray(getattr(model, "booster_", model).predict(X, pred_contrib=True), dtype=np.float64)
+    if contrib.ndim != 2 or contrib.shape[1] != X.shape[1] + 1:
+        raise ValueError(
+            f"pred_contrib returned shape {contrib.shape} for {X.shape[1]} features; "
+            "local explanations need a binary model"
+        )
+    return contrib[:, :-1]  # last column is the expected value
+
+
+def explain(model, X, probs: np.ndarray, threshold: float, mode: str = "at_risk"):
+    """
+    top_k() of the rows of X selected by mode, aligned with X (feature -1 for rows
+    that are not explained), or None when no row is explained or the model has no
+    pred_contrib.
+    """
+    if mode == "off" or not supports_contributions(model):
+        return None
+    rows = np.flatnonzero(probs >= threshold) if mode == "at_risk" else np.arange(len(probs))
+    if not len(rows):
+        return None
+
+    idx, values = top_k(contributions(model, X[rows]))
+    top = np.full((len(probs), idx.shape[1]), -1, dtype=np.int16), np.zeros((len(probs), idx.shape[1]), dtype=np.float32)
+    top[0][rows], top[1][rows] = idx, values
+    return top
+
+
+def top_k(contrib: np.ndarray, k: int = TOP_K) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Row-wise top-k features by |contribution|, strongest first.
+    Returns (feature indices int16[n, k], values float32[n, k]).
+    """
+    k = min(k, contrib.shape[1])
+    magnitude = np.abs(contrib)
+    idx = np.argpartition(-magnitude, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(magnitude, idx, axis=1), axis=1, kind="stable")
+    idx = np.take_along_axis(idx, order, axis=1)
+    return idx.astype(np.int16), np.take_along_axis(contrib, idx, axis=1).astype(np.float32)
+
+
+def pack_rows(idx: np.ndarray, values: np.ndarray) -> list[bytes | None]:
+    """One bytes value per row for the risk_scores.top_contributions column (None: not explained)."""
+    packed = np.empty(idx.shape, dtype=PACKED)
+    packed["feature"] = idx
+    packed["value"] = values
+    return [row.tobytes() if row["feature"][0] >= 0 else None for row in packed]
+
+
+def unpack(blob: bytes | None, feature_columns: list[str] | None) -> list[dict] | None:
+    if not blob or not feature_columns:
+        return None
+    packed = np.frombuffer(blob, dtype=PACKED)
+    return [
+        {"feature": feature_columns[int(i)], "contribution": round(float(v), 4)}
+        for i, v in zip(packed["feature"], packed["value"])
+        if 0 <= i < len(feature_columns)
+    ]
@@ -0,0 +1,278 @@
+"""
+Streaming bulk ingestion of exam blueprints and student responses.
+
+Records are read lazily from CSV or NDJSON, validated in chunks against
+cached lookups, and written with one bulk statement per chunk:
+  - Postgres: COPY into a temp table, then INSERT ... SELECT ... ON CONFLICT DO UPDATE
+  - SQLite / others: executemany INSERT ... ON CONFLICT DO UPDATE
+Conflicts on uq_exam_question / uq_resp become upserts, so re-running a file
+is safe. Each chunk is committed on its own; memory stays bounded by chunk_size.
+"""
+import csv
+import io
+import json
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import text
+
+from .. import db
+from ..models import ExamBlueprint, Student, StudentResponse
+from .catalog_cache import bump_catalog_version, catalog_cache
+from .score_inputs import mark_inputs_changed
+
+DEFAULT_CHUNK_SIZE = 5000
+INT32_MAX = 2**31 - 1  # ids are INTEGER columns
+
+_TRUE = {"1", "true", "t", "yes", "y"}
+_FALSE = {"0", "false", "f", "no", "n"}
+
+
+# -----------------------
+# Reading
+# -----------------------
+def read_records(fh, fmt: str):
+    """Yields dict records from an open text stream in "csv" or "ndjson" format."""
+    fmt = fmt.lower()
+    if fmt == "csv":
+        yield from csv.DictReader(fh)
+    elif fmt in ("ndjson", "jsonl"):
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None  # counted as malformed
+    else:
+        raise ValueError(f"Unsupported format: {fmt!r} (use csv or ndjson)")
+
+
+def iter_records(path, fmt: str | None = None):
+    """Yields dict records from a .csv or .ndjson/.jsonl file (format by extension unless given)."""
+    path = Path(path)
+    with path.open("r", encoding="utf-8", newline="") as fh:
+        yield from read_records(fh, fmt or path.suffix.lstrip("."))
+
+
+def _chunks(records, size: int):
+    chunk = []
+    for rec in records:
+        chunk.append(rec)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _to_int(value) -> int:
+    n = int(str(value).strip())
+    if not 0 <= n <= INT32_MAX:
+        raise ValueError(f"id out of range: {n}")
+    return n
+
+
+def _to_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    s = str(value).strip().lower()
+    if s in _TRUE:
+        return True
+    if s in _FALSE:
+        return False
+    raise ValueError(f"not a boolean: {value!r}")
+
+
+# -----------------------
+# Writing
+# -----------------------
+def _copy_upsert_postgres(table: str, columns: list[str], conflict: list[str], updates: list[str], rows) -> None:
+    """COPY rows into a temp table, then merge them with one INSERT ... ON CONFLICT."""
+    tmp = f"_ingest_{table}"
+    cols = ", ".join(columns)
+    db.session.execute(text(
+        f"CREATE TEMP TABLE IF NOT EXISTS {tmp} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+    ))
+    cursor = db.session.connection().connection.cursor()
+    copy_sql = f"COPY {tmp} ({cols}) FROM STDIN"
+    if hasattr(cursor, "copy"):  # psycopg 3
+        with cursor.copy(copy_sql) as copy:
+            for row in rows:
+                copy.write_row(row)
+    else:  # psycopg2
+        buf = io.StringIO()
+        csv.writer(buf, delimiter="\t", lineterminator="\n").writerows(rows)
+        buf.seek(0)
+        cursor.copy_expert(copy_sql, buf)
+
+    set_clause = ", ".join(f"{c} = EXCLUDED.{c}" for c in updates)
+    db.session.execute(text(
+        f"INSERT INTO {table} ({cols}) SELECT {cols} FROM {tmp} "
+        f"ON CONFLICT ({', '.join(conflict)}) DO UPDATE SET {set_clause}"
+    ))
+
+
+def _executemany_upsert(model, conflict: list[str], updates: list[str], rows: list[dict]) -> None:
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+
+    stmt = dialect_insert(model.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=conflict,
+        set_={c: getattr(stmt.excluded, c) for c in updates},
+    )
+    db.session.execute(stmt, rows)
+
+
+def _upsert(model, columns: list[str], conflict: list[str], updates: list[str], rows: list[tuple]) -> None:
+    if not rows:
+        return
+    if db.session.get_bind().dialect.name == "postgresql":
+        _copy_upsert_postgres(model.__tablename__, columns, conflict, updates, rows)
+    else:
+        _executemany_upsert(model, conflict, updates, [dict(zip(columns, r)) for r in rows])
+
+
+# -----------------------
+# Validation lookups
+# -----------------------
+class _StudentIdLookup:
+    """
+    Remembers which student ids exist (optionally: belong to advisor_id);
+    unseen ids are resolved with one IN query per chunk.
+    """
+
+    def __init__(self, advisor_id: int | None = None):
+        self.advisor_id = advisor_id
+        self.known: set[int] = set()
+        self.missing: set[int] = set()
+
+    def filter_known(self, ids: set[int]) -> set[int]:
+        unseen = ids - self.known - self.missing
+        if unseen:
+            q = db.session.query(Student.id).filter(Student.id.in_(list(unseen)))
+            if self.advisor_id is not None:
+                q = q.filter(Student.advisor_id == self.advisor_id)
+            found = {sid for (sid,) in q.all()}
+            self.known |= found
+            self.missing |= unseen - found
+        return ids & self.known
+
+
+def _result(stats: Counter, rejected: Counter, started: float) -> dict:
+    seconds = time.perf_counter() - started
+    return {
+        "read": stats["read"],
+        "written": stats["written"],
+        "rejected": sum(rejected.values()),
+        "rejected_reasons": dict(rejected),
+        "chunks": stats["chunks"],
+        "seconds": round(seconds, 3),
+        "rows_per_s": round(stats["written"] / seconds, 1) if seconds > 0 else None,
+    }
+
+
+# -----------------------
+# Public API
+# -----------------------
+def ingest_blueprints(records, chunk_size: int = DEFAULT_CHUNK_SIZE, progress=None) -> dict:
+    """Records: {exam_id, question_id, topic_tag}. Upserts on uq_exam_question (topic_tag updated)."""
+    started = time.perf_counter()
+    stats, rejected = Counter(), Counter()
+
+    for chunk in _chunks(records, max(1, int(chunk_size))):
+        rows: dict[tuple, tuple] = {}
+        for rec in chunk:
+            stats["read"] += 1
+            try:
+                exam_id, qid = _to_int(rec["exam_id"]), _to_int(rec["question_id"])
+                topic = str(rec["topic_tag"]).strip()
+            except (KeyError, TypeError, ValueError):
+                rejected["malformed"] += 1
+                continue
+            if not topic:
+                rejected["empty_topic"] += 1
+                continue
+            rows[(exam_id, qid)] = (exam_id, qid, topic)  # last one wins within a chunk
+
+        _upsert(ExamBlueprint, ["exam_id", "question_id", "topic_tag"], ["exam_id", "question_id"], ["topic_tag"], list(rows.values()))
+        bump_catalog_version()
+        db.session.commit()
+        stats["written"] += len(rows)
+        stats["chunks"] += 1
+        if progress:
+            progress(_result(stats, rejected, started))
+
+    return _result(stats, rejected, started)
+
+
+def _in_blueprint(parsed: list[tuple]) -> np.ndarray:
+    """Mask of rows whose (exam_id, question_id) is in the cached blueprint; one lookup per exam."""
+    exam_ids = np.fromiter((p[0] for p in parsed), dtype=np.int64, count=len(parsed))
+    qids = np.fromiter((p[2] for p in parsed), dtype=np.int32, count=len(parsed))
+    ok = np.zeros(len(parsed), dtype=bool)
+    for exam_id in np.unique(exam_ids).tolist():
+        sel = exam_ids == exam_id
+        ok[sel] = catalog_cache.blueprint(exam_id).codes_for(qids[sel]) >= 0
+    return ok
+
+
+def ingest_responses(records, chunk_size: int = DEFAULT_CHUNK_SIZE, advisor_id: int | None = None, progress=None) -> dict:
+    """
+    Records: {exam_id, student_id, question_id, is_correct}. Upserts on uq_resp.
+    Rows are rejected when the student does not exist (or is not advisor_id's,
+    when given) or the question is not in the exam's blueprint (load blueprints first).
+    """
+    started = time.perf_counter()
+    stats, rejected = Counter(), Counter()
+    students = _StudentIdLookup(advisor_id)
+
+    for chunk in _chunks(records, max(1, int(chunk_size))):
+        parsed = []
+        for rec in chunk:
+            stats["read"] += 1
+            try:
+                parsed.append((
+                    _to_int(rec["exam_id"]),
+                    _to_int(rec["student_id"]),
+                    _to_int(rec["question_id"]),
+                    _to_bool(rec["is_correct"]),
+                ))
+            except (KeyError, TypeError, ValueError):
+                rejected["malformed"] += 1
+
+        known = students.filter_known({p[1] for p in parsed})
+        in_blueprint = _in_blueprint(parsed) if parsed else []
+
+        rows: dict[tuple, tuple] = {}
+        for (exam_id, sid, qid, ok), valid_q in zip(parsed, in_blueprint):
+            if sid not in known:
+                rejected["unknown_student"] += 1
+                continue
+            if not valid_q:
+                rejected["unknown_question"] += 1
+                continue
+            rows[(exam_id, sid, qid)] = (exam_id, sid, qid, ok)  # last one wins within a chunk
+
+        _upsert(
+            StudentResponse,
+            ["exam_id", "student_id", "question_id", "is_correct"],
+            ["exam_id", "student_id", "question_id"],
+            ["is_correct"],
+            list(rows.values()),
+        )
+        mark_inputs_changed({key[1] for key in rows})
+        db.session.commit()
+        stats["written"] += len(rows)
+        stats["chunks"] += 1
+        if progress:
+            progress(_result(stats, rejected, started))
+
+    return _result(stats, rejected, started)
@@ -0,0 +1,185 @@
+"""
+Background prediction jobs.
+
+POST /api/advisor/predict-risk only records a PredictionJob row and hands the
+work to a bounded in-process thread pool; the HTTP worker returns immediately
+and the client polls GET /api/advisor/predict-risk/<job_id>.
+
+- State lives in the prediction_jobs table, so any worker can answer a poll.
+- At most PREDICTION_JOB_WORKERS jobs run at once per process and at most
+  PREDICTION_JOB_QUEUE_MAX may be waiting; beyond that submissions are refused.
+- An advisor with a queued/running job gets that job back instead of a new one,
+  as long as it covers the request: a full run is never answered with an
+  incremental job (a full job does answer an incremental request).
+  Jobs whose heartbeat is older than PREDICTION_JOB_STALE_SECONDS (e.g. the
+  process died mid-run) no longer block new submissions, and are marked
+  failed when polled. Every progress update also refreshes the heartbeat of
+  the jobs still queued in this process, so waiting is not mistaken for dead.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from .. import db
+from ..models import PredictionJob, Student
+from .predict import run_batch_risk_prediction
+
+ACTIVE_STATUSES = ("queued", "running")
+
+_lock = threading.Lock()
+_executor: ThreadPoolExecutor | None = None
+_pending = 0  # submitted but not finished, in this process
+_queued: set[int] = set()  # submitted but not started, in this process
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+def _get_executor(max_workers: int) -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="predict-job")
+    return _executor
+
+
+def _stale_before() -> datetime:
+    return datetime.utcnow() - timedelta(seconds=int(current_app.config.get("PREDICTION_JOB_STALE_SECONDS", 3600)))
+
+
+def _active_job_for_advisor(advisor_id: int, incremental: bool = True) -> PredictionJob | None:
+    """Newest live job of the advisor that covers the request (full jobs only, for a full request)."""
+    query = PredictionJob.query.filter(
+        PredictionJob.advisor_id == advisor_id,
+        PredictionJob.status.in_(ACTIVE_STATUSES),
+        PredictionJob.heartbeat_at >= _stale_before(),
+    )
+    if not incremental:
+        query = query.filter(PredictionJob.incremental.is_(False))
+    return query.order_by(PredictionJob.created_at.desc()).first()
+
+
+def submit_prediction_job(advisor_id: int, incremental: bool = True) -> tuple[PredictionJob, bool]:
+    """
+    Enqueue a scoring job for all students of the advisor; incremental jobs
+    only re-score students whose latest score is stale (see score_inputs.py).
+    Returns (job, created); created is False when an active job that covers
+    the request was reused.
+    Raises JobQueueFull when the process already has too many pending jobs.
+    """
+    global _pending
+    app = current_app._get_current_object()
+
+    # the lock makes check-then-insert atomic for concurrent requests in this process
+    with _lock:
+        existing = _active_job_for_advisor(advisor_id, incremental)
+        if existing:
+            return existing, False
+
+        if _pending >= int(app.config.get("PREDICTION_JOB_QUEUE_MAX", 16)):
+            raise JobQueueFull()
+
+        job = PredictionJob(advisor_id=advisor_id, status="queued", incremental=incremental)
+        db.session.add(job)
+        db.session.commit()
+
+        _pending += 1
+        _queued.add(job.id)
+        executor = _get_executor(int(app.config.get("PREDICTION_JOB_WORKERS", 2)))
+        executor.submit(_run_job, app, job.id)
+
+    return job, True
+
+
+def _update_job(job_id: int, **values) -> None:
+    now = values["heartbeat_at"] = datetime.utcnow()
+    PredictionJob.query.filter_by(id=job_id).update(values)
+    waiting = list(_queued)
+    if waiting:
+        PredictionJob.query.filter(
+            PredictionJob.id.in_(waiting), PredictionJob.status == "queued"
+        ).update({"heartbeat_at": now}, synchronize_session=False)
+    db.session.commit()
+
+
+def poll_job_payload(job: PredictionJob) -> dict:
+    """
+    job_payload() for a status poll. An active job whose heartbeat is older than
+    PREDICTION_JOB_STALE_SECONDS lost its worker; it is marked failed first.
+    """
+    if job.status not in ACTIVE_STATUSES or job.heartbeat_at >= _stale_before():
+        return job_payload(job)
+    job.status = "failed"
+    job.finished_at = datetime.utcnow()
+    job.error = "Job stopped reporting progress (worker restarted?); start a new one"
+    payload = job_payload(job)  # before commit, which would expire (and reload) the row
+    db.session.commit()
+    return payload
+
+
+def _run_job(app, job_id: int) -> None:
+    global _pending
+    _queued.discard(job_id)
+    try:
+        with app.app_context():
+            try:
+                job = db.session.get(PredictionJob, job_id)
+                if job.status != "queued":
+                    return  # expired by a status poll while it waited
+                student_ids = [
+                    sid for (sid,) in db.session.query(Student.id).filter_by(advisor_id=job.advisor_id).all()
+                ]
+                _update_job(job_id, status="running", started_at=datetime.utcnow(), total=len(student_ids))
+
+                def progress(p: dict) -> None:
+                    _update_job(
+                        job_id, processed=p["processed"], created=p["created"], updated=p["updated"], skipped=p["skipped"]
+                    )
+
+                result = run_batch_risk_prediction(
+                    student_ids=student_ids, progress=progress, incremental=job.incremental
+                )
+                _update_job(
+                    job_id,
+                    status="succeeded",
+                    finished_at=datetime.utcnow(),
+                    processed=result["rescored"] + result["skipped"],
+                    created=result["created"],
+                    updated=result["updated"],
+                    skipped=result["skipped"],
+                )
+            except Exception as exc:
+                db.session.rollback()
+                current_app.logger.exception("prediction job %s failed", job_id)
+                _update_job(job_id, status="failed", finished_at=datetime.utcnow(), error=str(exc)[:1000])
+            finally:
+                db.session.remove()
+    finally:
+        with _lock:
+            _pending -= 1
+
+
+def job_payload(job: PredictionJob) -> dict:
+    end = job.finished_at or datetime.utcnow()
+    duration = (end - job.started_at).total_seconds() if job.started_at else None
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "progress": {
+            "processed": job.processed,
+            "total": job.total,
+            "pct": round(100.0 * job.processed / job.total, 1) if job.total else None,
+        },
+        "incremental": job.incremental,
+        "rescored": job.created + job.updated,
+        "skipped": job.skipped,
+        "created": job.created,
+        "updated": job.updated,
+        "error": job.error,
+        "created_at": job.created_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "duration_seconds": round(duration, 3) if duration is not None else None,
+    }
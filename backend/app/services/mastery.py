@@ -0,0 +1,83 @@
+import numpy as np
+from sqlalchemy import and_, case, func
+
+from .. import db
+from ..models import ExamBlueprint, Student, StudentResponse
+from .catalog_cache import UNKNOWN_TOPIC
+
+BOTTOM_DECILE_PCT = 10
+
+
+def build_mastery_matrix(advisor_id: int, exam_id: int) -> dict:
+    """
+    Students x topics mastery (% correct) for all of an advisor's students on one exam.
+
+    ONE aggregate query returns (student, topic, correct, total) rows, which are
+    pivoted into a dense float matrix with NumPy (NaN = no answers on that topic).
+    Per topic: cohort mean and the students at or below the 10th percentile.
+    """
+    topic = func.coalesce(ExamBlueprint.topic_tag, UNKNOWN_TOPIC)
+    rows = (
+        db.session.query(
+            Student.id,
+            Student.name,
+            topic.label("topic"),
+            func.sum(case((StudentResponse.is_correct, 1), else_=0)),
+            func.count(StudentResponse.id),
+        )
+        .select_from(StudentResponse)
+        .join(Student, Student.id == StudentResponse.student_id)
+        .outerjoin(
+            ExamBlueprint,
+            and_(
+                ExamBlueprint.exam_id == StudentResponse.exam_id,
+                ExamBlueprint.question_id == StudentResponse.question_id,
+            ),
+        )
+        .filter(StudentResponse.exam_id == exam_id, Student.advisor_id == advisor_id)
+        .group_by(Student.id, Student.name, topic)
+        .all()
+    )
+
+    if not rows:
+        return {"exam_id": exam_id, "students": [], "topics": [], "matrix": [], "topic_stats": []}
+
+    sids, names, topics, correct, total = zip(*rows)
+    student_ids, s_idx = np.unique(np.asarray(sids, dtype=np.int64), return_inverse=True)
+    topic_names, t_idx = np.unique(np.asarray(topics, dtype=object), return_inverse=True)
+
+    correct = np.asarray(correct, dtype=np.float64)
+    total = np.asarray(total, dtype=np.float64)
+
+    matrix = np.full((len(student_ids), len(topic_names)), np.nan)
+    matrix[s_idx, t_idx] = np.where(total > 0, correct / np.maximum(total, 1) * 100.0, np.nan)
+
+    name_by_id = dict(zip(sids, names))
+
+    has_data = ~np.isnan(matrix)
+    counts = has_data.sum(axis=0)
+    with np.errstate(all="ignore"):
+        means = np.nanmean(matrix, axis=0)
+        thresholds = np.nanpercentile(matrix, BOTTOM_DECILE_PCT, axis=0)
+    in_bottom = has_data & (matrix <= thresholds[np.newaxis, :])
+
+    topic_stats = []
+    for j, t in enumerate(topic_names):
+        topic_stats.append({
+            "topic": t,
+            "students_with_data": int(counts[j]),
+            "cohort_mean_pct": round(float(means[j]), 1) if counts[j] else None,
+            "bottom_decile_threshold_pct": round(float(thresholds[j]), 1) if counts[j] else None,
+            "bottom_decile_student_ids": student_ids[in_bottom[:, j]].tolist(),
+        })
+
+    cells = np.round(matrix, 1).astype(object)
+    cells[~has_data] = None
+    return {
+        "exam_id": exam_id,
+        "students": [{"student_id": int(sid), "name": name_by_id[sid]} for sid in student_ids.tolist()],
+        "topics": topic_names.tolist(),
+        # row i = students[i], column j = topics[j]; null = no answers on that topic
+        "matrix": cells.tolist(),
+        "topic_stats": topic_stats,
+    }
@@ -0,0 +1,263 @@
+"""
+Prometheus metrics (text exposition format 0.0.4) without extra dependencies.
+
+Hot-path updates never take a lock: every thread writes into its own shard
+(a plain dict), registered once per thread. A scrape sums all shards; shards
+of threads that have exited are folded into one retired shard so short-lived
+threads (dev server) do not pile up.
+
+Exposed at GET /api/metrics:
+  - pass_http_requests_total / pass_http_request_duration_seconds (histogram)
+    by blueprint, endpoint, method (and status for the counter)
+  - pass_http_requests_in_flight by blueprint
+  - pass_prediction_batches_total, pass_prediction_batch_size and
+    pass_prediction_batch_duration_seconds (model inference calls only:
+    scoring-run chunks and what-if micro-batches, not feature building)
+  - pass_score_batch_requests (POST /api/advisor/score calls per micro-batch)
+  - pass_db_pool_checkout_seconds (time to get a pooled connection)
+  - model load time / loads / errors, cache hits / misses / hit ratios and
+    pending prediction jobs, read at scrape time
+Set METRICS_TOKEN to require "Authorization: Bearer <token>" on the endpoint.
+"""
+import hmac
+import threading
+import time
+
+from flask import Response, current_app, g, request
+
+from .. import db
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+BATCH_SIZE_BUCKETS = (1, 10, 50, 100, 500, 1000, 2000, 5000, 10000)
+
+# name -> (type, help, buckets or None)
+_METRICS = {
+    "pass_http_requests_total": ("counter", "HTTP requests handled.", None),
+    "pass_http_request_duration_seconds": ("histogram", "HTTP request latency.", LATENCY_BUCKETS),
+    "pass_http_requests_in_flight": ("gauge", "HTTP requests currently being handled.", None),
+    "pass_prediction_batches_total": ("counter", "Model inference calls (scoring chunks and what-if micro-batches).", None),
+    "pass_prediction_batch_size": ("histogram", "Rows per model inference call.", BATCH_SIZE_BUCKETS),
+    "pass_prediction_batch_duration_seconds": ("histogram", "Model inference wall time per call.", LATENCY_BUCKETS),
+    "pass_score_batch_requests": ("histogram", "Scoring API requests coalesced per model call.", BATCH_SIZE_BUCKETS),
+    "pass_db_pool_checkout_seconds": ("histogram", "Time to check a connection out of the pool.", POOL_WAIT_BUCKETS),
+}
+
+
+class _Registry:
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()  # only for shard registration and scrapes
+        self._shards: list[tuple[threading.Thread, dict]] = []
+        self._retired: dict = {}
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def inc(self, name: str, labels: tuple = (), value: float = 1.0) -> None:
+        shard = self._shard()
+        key = (name, labels)
+        shard[key] = shard.get(key, 0.0) + value
+
+    def observe(self, name: str, labels: tuple, value: float) -> None:
+        shard = self._shard()
+        key = (name, labels)
+        h = shard.get(key)
+        buckets = _METRICS[name][2]
+        if h is None:
+            h = shard[key] = [0] * (len(buckets) + 2)  # per-bucket counts, +Inf count, sum
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                h[i] += 1
+                break
+        else:
+            h[len(buckets)] += 1
+        h[-1] += value
+
+    @staticmethod
+    def _merge(into: dict, shard: dict) -> None:
+        for key, value in shard.items():
+            if isinstance(value, list):
+                cur = into.get(key)
+                into[key] = list(value) if cur is None else [a + b for a, b in zip(cur, value)]
+            else:
+                into[key] = into.get(key, 0.0) + value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            alive = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, shard))
+                else:
+                    self._merge(self._retired, shard)  # its owner can no longer write
+            self._shards = alive
+            total: dict = {}
+            self._merge(total, self._retired)
+            for _, shard in alive:
+                self._merge(total, dict(shard))  # dict() copies atomically under the GIL
+        return total
+
+
+registry = _Registry()
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")  # noqa: E731
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
+
+
+def _fmt(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render() -> str:
+    values = registry.snapshot()
+    by_name: dict[str, list] = {}
+    for (name, labels), value in values.items():
+        by_name.setdefault(name, []).append((labels, value))
+
+    lines = []
+    for name, (kind, help_text, buckets) in _METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(by_name.get(name, []), key=lambda x: x[0]):
+            if kind != "histogram":
+                lines.append(f"{name}{_labels(labels)} {_fmt(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets, value):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+            count = cumulative + value[len(buckets)]
+            lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{_labels(labels)} {_fmt(float(value[-1]))}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+
+    lines.extend(_scrape_time_metrics())
+    return "\n".join(lines) + "\n"
+
+
+def _scrape_time_metrics() -> list[str]:
+    """Values other components already keep; read once per scrape."""
+    from . import jobs
+    from .catalog_cache import catalog_cache
+    from .predict import model_registry
+    from .response_cache import response_cache
+
+    model = model_registry.stats()
+    lines = [
+        "# HELP pass_model_loaded Whether a model bundle is loaded (1) or the fallback scorer is used (0).",
+        "# TYPE pass_model_loaded gauge",
+        f"pass_model_loaded {int(model['loaded'])}",
+        "# HELP pass_model_last_load_seconds Time the last model bundle load took.",
+        "# TYPE pass_model_last_load_seconds gauge",
+        f"pass_model_last_load_seconds {_fmt(float(model['last_load_seconds'] or 0.0))}",
+        "# HELP pass_model_loads_total Model bundle loads.",
+        "# TYPE pass_model_loads_total counter",
+        f"pass_model_loads_total {model['loads']}",
+        "# HELP pass_model_load_errors_total Failed model bundle loads.",
+        "# TYPE pass_model_load_errors_total counter",
+        f"pass_model_load_errors_total {model['load_errors']}",
+        "# HELP pass_prediction_jobs_pending Prediction jobs queued or running in this process.",
+        "# TYPE pass_prediction_jobs_pending gauge",
+        f"pass_prediction_jobs_pending {jobs._pending}",
+    ]
+
+    caches = {
+        "model": (model["hits"], model["loads"] + model["load_errors"]),
+        "response": (response_cache.hits, response_cache.misses),
+        "catalog": (catalog_cache.hits, catalog_cache.misses),
+    }
+    for metric, kind, help_text, pick in (
+        ("pass_cache_hits_total", "counter", "Cache hits.", lambda h, m: h),
+        ("pass_cache_misses_total", "counter", "Cache misses.", lambda h, m: m),
+        ("pass_cache_hit_ratio", "gauge", "Cache hit ratio since start.", lambda h, m: (h / (h + m)) if h + m else 0.0),
+    ):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for name, (hits, misses) in caches.items():
+            lines.append(f"{metric}{_labels((('cache', name),))} {_fmt(pick(hits, misses))}")
+    return lines
+
+
+# -----------------------
+# Recording helpers
+# -----------------------
+def observe_prediction_batch(size: int, seconds: float) -> None:
+    registry.inc("pass_prediction_batches_total")
+    registry.observe("pass_prediction_batch_size", (), size)
+    registry.observe("pass_prediction_batch_duration_seconds", (), seconds)
+
+
+def observe_score_batch(requests: int) -> None:
+    registry.observe("pass_score_batch_requests", (), requests)
+
+
+def _instrument_pool(engine) -> None:
+    pool = engine.pool
+    connect = pool.connect
+
+    def timed_connect(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return connect(*args, **kwargs)
+        finally:
+            registry.observe("pass_db_pool_checkout_seconds", (), time.perf_counter() - t0)
+
+    pool.connect = timed_connect
+
+
+def _request_started():
+    g._metrics = (time.perf_counter(), request.blueprint or "app")
+    registry.inc("pass_http_requests_in_flight", (("blueprint", g._metrics[1]),))
+
+
+def _request_status(response):
+    g._metrics_status = response.status_code
+    return response
+
+
+def _request_finished(exc):
+    started = g.pop("_metrics", None)
+    if started is None:
+        return
+    t0, blueprint = started
+    status = 500 if exc is not None else g.pop("_metrics_status", 500)
+    endpoint = request.endpoint or "unmatched"
+    registry.inc("pass_http_requests_in_flight", (("blueprint", blueprint),), -1.0)
+    registry.inc(
+        "pass_http_requests_total",
+        (("blueprint", blueprint), ("endpoint", endpoint), ("method", request.method), ("status", status)),
+    )
+    registry.observe(
+        "pass_http_request_duration_seconds",
+        (("blueprint", blueprint), ("endpoint", endpoint), ("method", request.method)),
+        time.perf_counter() - t0,
+    )
+
+
+def metrics_view():
+    token = current_app.config.get("METRICS_TOKEN")
+    if token:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(supplied, token):
+            return {"error": "Unauthorized"}, 401
+    return Response(render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+
+def init_metrics(app) -> None:
+    with app.app_context():
+        _instrument_pool(db.engine)
+
+    app.before_request(_request_started)
+    app.after_request(_request_status)
+    app.teardown_request(_request_finished)
+    app.add_url_rule("/api/metrics", "metrics", metrics_view, methods=["GET"])
@@ -0,0 +1,97 @@
+import hashlib
+import io
+import threading
+import time
+from pathlib import Path
+
+import joblib
+
+
+class ModelRegistry:
+    """
+    Process-wide cache for the trained model bundle.
+
+    - loads the bundle once per worker process
+    - on every get(), compares the file's (mtime_ns, size) with the loaded one
+      (a single os.stat, no unpickling) and reloads only when the file changed
+    - swaps the new bundle in atomically: readers always see either the old
+      or the new bundle, never a half-loaded one
+    - keeps simple counters (hits / loads / last load time) for diagnostics
+    - remembers the sha256 of the loaded file (identifies the model version)
+    - remembers the signature of a file that failed to load and only retries
+      once the file changes again
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._loaded = (None, None)  # (bundle, sha256 of its file), swapped as one reference
+        self._signature = None  # (mtime_ns, size) of the loaded file
+        self._failed_signature = None  # (mtime_ns, size) of the last file that failed to load
+        self._stats = {
+            "hits": 0,
+            "loads": 0,
+            "load_errors": 0,
+            "last_load_seconds": None,
+            "last_loaded_at": None,
+        }
+
+    def _file_signature(self):
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def get(self):
+        """Return the current bundle (or None if missing / unloadable)."""
+        return self.get_versioned()[0]
+
+    def get_versioned(self):
+        """Return (bundle, sha256 of its file), or (None, None); the pair is always consistent."""
+        sig = self._file_signature()
+        if sig is None:
+            return None, None
+
+        current = self._loaded
+        if current[0] is not None and sig == self._signature:
+            self._stats["hits"] += 1
+            return current
+        if sig == self._failed_signature:
+            return current
+
+        with self._lock:
+            # another thread may have reloaded while we waited for the lock
+            if self._loaded[0] is not None and sig == self._signature:
+                self._stats["hits"] += 1
+                return self._loaded
+            if sig == self._failed_signature:
+                return self._loaded
+
+            t0 = time.perf_counter()
+            try:
+                raw = self.path.read_bytes()
+                new_bundle = joblib.load(io.BytesIO(raw))
+            except Exception:
+                # Keep service resilient: a half-written file (training still running)
+                # must not take down scoring, so keep serving the previous bundle.
+                self._stats["load_errors"] += 1
+                self._failed_signature = sig
+                return self._loaded
+
+            self._loaded = (new_bundle, hashlib.sha256(raw).hexdigest())
+            self._signature = sig
+            self._stats["loads"] += 1
+            self._stats["last_load_seconds"] = round(time.perf_counter() - t0, 4)
+            self._stats["last_loaded_at"] = time.time()
+            return self._loaded
+
+    def invalidate(self) -> None:
+        """Forget the cached bundle; next get() reloads from disk."""
+        with self._lock:
+            self._loaded = (None, None)
+            self._signature = None
+            self._failed_signature = None
+
+    def stats(self) -> dict:
+        return {**self._stats, "loaded": self._loaded[0] is not None}
@@ -0,0 +1,138 @@
+"""
+Registry of model versions that have produced risk scores.
+
+Each distinct bundle file (by sha256) gets one immutable model_versions row
+holding its feature columns, threshold, global importances and training
+time; RiskScore rows only reference it by id. Rows never change, so parsed
+versions are cached per process without invalidation. A new row is committed
+in its own short session before its id is cached, so a rollback of the
+caller's transaction can never leave the cache pointing at a missing row.
+"""
+import json
+import threading
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import db
+from ..models import ModelVersion
+
+TOP_FACTORS = 6
+FALLBACK_HASH = "fallback"  # deterministic scorer used when no bundle is available
+
+FALLBACK_IMPORTANCES = [
+    {"feature": "Grade_1st_Sem", "importance": 0.42},
+    {"feature": "Attendance", "importance": 0.31},
+    {"feature": "LMS_Logins", "importance": 0.27},
+]
+
+
+def _importances(bundle) -> list[dict]:
+    """Global feature importances, descending."""
+    model = bundle["model"]
+    feature_cols = bundle["feature_columns"]
+    importances = getattr(model, "feature_importances_", None)
+    if importances is None:
+        return []
+    order = np.argsort(importances)[::-1]
+    return [{"feature": feature_cols[i], "importance": float(importances[i])} for i in order]
+
+
+def _trained_at(bundle) -> datetime | None:
+    value = bundle.get("trained_at")
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return value if isinstance(value, datetime) else None
+
+
+def _parsed(row: ModelVersion) -> dict:
+    importances = json.loads(row.importances_json) if row.importances_json else []
+    return {
+        "id": row.id,
+        "bundle_hash": row.bundle_hash,
+        "feature_columns": json.loads(row.feature_columns_json) if row.feature_columns_json else None,
+        "threshold": row.threshold,
+        "importances": importances,
+        "top_factors": importances[:TOP_FACTORS],
+        "trained_at": row.trained_at.isoformat() if row.trained_at else None,
+    }
+
+
+class ModelVersionCache:
+    def __init__(self):
+        self._by_hash: dict[str, int] = {}
+        self._by_id: dict[int, dict] = {}
+        self._lock = threading.Lock()
+
+    def _remember(self, row: ModelVersion) -> dict:
+        parsed = _parsed(row)
+        with self._lock:
+            self._by_hash[row.bundle_hash] = row.id
+            self._by_id[row.id] = parsed
+        return parsed
+
+    def ensure(self, bundle, bundle_hash: str | None) -> int:
+        """Id of the version for this bundle (None bundle = fallback scorer); inserted on first use."""
+        key = bundle_hash if bundle is not None else FALLBACK_HASH
+        version_id = self._by_hash.get(key)
+        if version_id is not None:
+            return version_id
+
+        row = ModelVersion.query.filter_by(bundle_hash=key).first()
+        if row is None:
+            if bundle is None:
+                row = ModelVersion(bundle_hash=key, importances_json=json.dumps(FALLBACK_IMPORTANCES))
+            else:
+                row = ModelVersion(
+                    bundle_hash=key,
+                    feature_columns_json=json.dumps(list(bundle["feature_columns"])),
+                    threshold=bundle.get("threshold"),
+                    importances_json=json.dumps(_importances(bundle)),
+                    trained_at=_trained_at(bundle),
+                )
+            row = self._insert(row)
+        return self._remember(row)["id"]
+
+    @staticmethod
+    def _insert(row: ModelVersion) -> ModelVersion:
+        # committed independently of db.session: the caller may still roll back its work
+        with Session(db.engine, expire_on_commit=False) as session:
+            session.add(row)
+            try:
+                session.commit()
+            except IntegrityError:
+                # another worker registered the same bundle first
+                session.rollback()
+                row = session.query(ModelVersion).filter_by(bundle_hash=row.bundle_hash).one()
+        return row
+
+    def lookup(self, bundle, bundle_hash: str | None) -> int | None:
+        """Like ensure() but read-only: None until a scoring run has registered the bundle."""
+        key = bundle_hash if bundle is not None else FALLBACK_HASH
+        version_id = self._by_hash.get(key)
+        if version_id is not None:
+            return version_id
+        row = ModelVersion.query.filter_by(bundle_hash=key).first()
+        return self._remember(row)["id"] if row is not None else None
+
+    def get(self, version_id: int | None) -> dict | None:
+        if version_id is None:
+            return None
+        parsed = self._by_id.get(version_id)
+        if parsed is None:
+            row = db.session.get(ModelVersion, version_id)
+            if row is None:
+                return None
+            parsed = self._remember(row)
+        return parsed
+
+    def stats(self) -> dict:
+        return {"cached_versions": len(self._by_id)}
+
+
+model_versions = ModelVersionCache()
@@ -0,0 +1,123 @@
+"""
+Compiled scoring adapter: feature signals -> float32 matrix -> Booster.predict.
+
+The DataFrame path (features.frame_from_signals + LGBMClassifier.predict_proba)
+builds pandas columns, infers per-batch categories and lets LightGBM remap them
+to the training categories on every call. For small and medium batches that
+costs more than evaluating the trees. A NativeScorer is compiled once per
+loaded bundle and holds:
+  - a per-column plan (DB signal, placeholder hash or category map)
+  - category -> code maps taken from the booster's training categories
+    (booster.pandas_categorical, same order as the categorical columns);
+    unseen values become NaN, exactly like pandas' set_categories
+  - a per-thread float32 buffer in model column order (C-contiguous, so
+    LightGBM reads it without copying), grown only when a batch is larger
+and calls the underlying Booster directly.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .features import FEATURE_SOURCES, _load_signals, _norm, _placeholder_numeric, frame_from_signals
+
+PARITY_TOLERANCE = 1e-6
+PLACEHOLDER_CATEGORIES = 5  # features.frame_from_signals: "cat_<id % 5>"
+
+
+class NativeScorer:
+    def __init__(self, bundle):
+        model = bundle["model"]
+        self.booster = getattr(model, "booster_", model)
+        self.feature_columns = list(bundle["feature_columns"])
+        cat_cols = set(bundle.get("categorical_features", []))
+        training_categories = iter(self.booster.pandas_categorical or [])
+
+        self._plan = []  # (kind, arg) per column
+        for j, c in enumerate(self.feature_columns):
+            source = FEATURE_SOURCES.get(_norm(c))
+            if c in cat_cols:
+                codes = {value: float(code) for code, value in enumerate(next(training_categories, []))}
+                if source is None:
+                    placeholder = [codes.get(f"cat_{k}", np.nan) for k in range(PLACEHOLDER_CATEGORIES)]
+                    self._plan.append(("placeholder_category", (np.array(placeholder, dtype=np.float32), codes)))
+                else:
+                    self._plan.append(("category", (source, codes)))
+            elif source is not None:
+                self._plan.append(("signal", source))
+            else:
+                self._plan.append(("placeholder", j))
+        self.column_index = {c: j for j, c in enumerate(self.feature_columns)}
+        self._local = threading.local()
+
+    def _buffer(self, n: int) -> np.ndarray:
+        buf = getattr(self._local, "buf", None)
+        if buf is None or buf.shape[0] < n:
+            buf = self._local.buf = np.empty((max(n, 64), len(self.feature_columns)), dtype=np.float32)
+        return buf[:n]
+
+    def matrix(self, ids: np.ndarray, signals: dict) -> np.ndarray:
+        """Fills this thread's buffer for ids; valid until the thread's next call."""
+        X = self._buffer(len(ids))
+        for j, (kind, arg) in enumerate(self._plan):
+            if kind == "signal":
+                values = signals[arg]
+                X[:, j] = values if values.dtype != object else np.nan
+            elif kind == "category":
+                source, codes = arg
+                # map each distinct value once; missing values (code -1) pick the trailing "unknown"
+                labels, uniques = pd.factorize(signals[source], use_na_sentinel=True)
+                mapped = [codes.get(str(v).strip(), np.nan) for v in uniques] + [codes.get("unknown", np.nan)]
+                X[:, j] = np.asarray(mapped, dtype=np.float32)[labels]
+            elif kind == "placeholder_category":
+                X[:, j] = arg[0][ids % PLACEHOLDER_CATEGORIES]
+            else:
+                X[:, j] = _placeholder_numeric(ids, arg)
+        return X
+
+    def encode(self, column: str, value) -> float:
+        """Matrix value for a caller-supplied feature; ValueError for unknown columns or non-numeric values."""
+        j = self.column_index.get(column)
+        if j is None:
+            raise ValueError(f"unknown feature: {column}")
+        if value is None:
+            return np.nan
+        kind, arg = self._plan[j]
+        if kind in ("category", "placeholder_category"):
+            return arg[1].get(str(value).strip(), np.nan)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"feature {column} must be a number")
+        return float(value)
+
+    def predict_signals(self, ids: np.ndarray, signals: dict, pred_contrib: bool = False) -> np.ndarray:
+        """Probabilities (binary model), or contributions[n, n_features + 1] with pred_contrib."""
+        return self.booster.predict(self.matrix(ids, signals), pred_contrib=pred_contrib)
+
+    def predict_proba(self, student_ids) -> np.ndarray:
+        ids = np.asarray(list(student_ids), dtype=np.int64)
+        return self.predict_signals(ids, _load_signals(ids))
+
+
+_compiled = (None, None)  # (bundle, NativeScorer), swapped as one reference
+
+
+def compiled_scorer(bundle) -> NativeScorer | None:
+    """The NativeScorer for this bundle, compiled on first use; None without a LightGBM booster."""
+    global _compiled
+    current = _compiled
+    if current[0] is bundle:
+        return current[1]
+    model = bundle["model"]
+    if not hasattr(getattr(model, "booster_", model), "pandas_categorical"):
+        return None
+    scorer = NativeScorer(bundle)
+    _compiled = (bundle, scorer)
+    return scorer
+
+
+def parity_error(bundle, ids: np.ndarray, signals: dict) -> float:
+    """Max |native - predict_proba(DataFrame)| over the batch."""
+    cat_cols = set(bundle.get("categorical_features", []))
+    frame = frame_from_signals(ids, signals, bundle["feature_columns"], cat_cols)
+    expected = bundle["model"].predict_proba(frame)[:, 1]
+    return float(np.max(np.abs(compiled_scorer(bundle).predict_signals(ids, signals) - expected), initial=0.0))
@@ -0,0 +1,178 @@
+"""
+What-if and service-to-service scoring without persistence.
+
+POST /api/advisor/score builds one float32 row per instance in the request
+thread (a student's current features with optional overrides, or a bare
+feature vector) and hands the rows to the process-wide MicroBatcher. Its
+single worker thread waits until SCORE_BATCH_MAX_SIZE rows are queued or the
+oldest request has waited SCORE_BATCH_MAX_WAIT_MS, stacks the rows and makes
+one Booster.predict call per model, then resolves each request's future with
+its slice. Concurrent callers share model calls instead of paying one each.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from .features import _load_signals
+from .metrics import observe_prediction_batch, observe_score_batch
+from .model_versions import model_versions
+from .native_scorer import NativeScorer, compiled_scorer
+from .predict import model_registry
+
+DEFAULT_MAX_BATCH_SIZE = 256
+DEFAULT_MAX_WAIT_MS = 5.0
+DEFAULT_MAX_INSTANCES = 1000
+RESULT_TIMEOUT_SECONDS = 10.0
+
+
+class ModelUnavailable(Exception):
+    pass
+
+
+class MicroBatcher:
+    def __init__(self, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE, max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stats = {"requests": 0, "rows": 0, "batches": 0}
+
+    def stats(self) -> dict:
+        out = dict(self._stats)
+        out["requests_per_batch"] = round(out["requests"] / out["batches"], 2) if out["batches"] else None
+        return out
+
+    def submit(self, scorer: NativeScorer, X: np.ndarray) -> Future:
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((scorer, X, future))
+        return future
+
+    def predict(self, scorer: NativeScorer, X: np.ndarray, timeout: float = RESULT_TIMEOUT_SECONDS) -> np.ndarray:
+        return self.submit(scorer, X).result(timeout)
+
+    def _ensure_worker(self) -> None:
+        # is_alive() is also False in a forked worker, which then starts its own thread
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="score-batcher", daemon=True)
+                self._thread.start()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        rows = len(batch[0][1])
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+        while rows < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            rows += len(item[1])
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            groups: dict[int, list] = {}  # a model reload mid-batch gives one group per scorer
+            for item in self._collect():
+                groups.setdefault(id(item[0]), []).append(item)
+            for items in groups.values():
+                self._predict(items)
+
+    def _predict(self, items: list) -> None:
+        scorer = items[0][0]
+        try:
+            X = items[0][1] if len(items) == 1 else np.concatenate([x for _, x, _ in items])
+            t0 = time.perf_counter()
+            probs = scorer.booster.predict(X)
+            observe_prediction_batch(len(X), time.perf_counter() - t0)
+        except Exception as e:
+            for _, _, future in items:
+                future.set_exception(e)
+            return
+
+        observe_score_batch(len(items))
+        self._stats["requests"] += len(items)
+        self._stats["rows"] += len(X)
+        self._stats["batches"] += 1
+        offset = 0
+        for _, x, future in items:
+            future.set_result(probs[offset:offset + len(x)])
+            offset += len(x)
+
+
+score_batcher = MicroBatcher()
+
+
+def configure_score_batcher(app) -> None:
+    score_batcher.max_batch_size = int(app.config.get("SCORE_BATCH_MAX_SIZE", score_batcher.max_batch_size))
+    score_batcher.max_wait_ms = float(app.config.get("SCORE_BATCH_MAX_WAIT_MS", score_batcher.max_wait_ms))
+
+
+def parse_instances(instances) -> list[tuple[int | None, dict]]:
+    """[(student_id or None, feature overrides)]; ValueError on malformed input."""
+    if not isinstance(instances, list) or not instances:
+        raise ValueError("instances must be a non-empty list")
+    parsed = []
+    for inst in instances:
+        if not isinstance(inst, dict):
+            raise ValueError("each instance must be an object")
+        sid = inst.get("student_id")
+        if sid is not None and (isinstance(sid, bool) or not isinstance(sid, int)):
+            raise ValueError("student_id must be an integer")
+        features = inst.get("features") or {}
+        if not isinstance(features, dict):
+            raise ValueError("features must be an object")
+        if sid is None and not features:
+            raise ValueError("each instance needs a student_id or features")
+        parsed.append((sid, features))
+    return parsed
+
+
+def build_rows(scorer: NativeScorer, parsed: list[tuple[int | None, dict]]) -> np.ndarray:
+    """
+    One float32 row per instance in model column order. Rows with a student_id
+    start from that student's current features, the others from all-missing;
+    given features override. Unknown features / bad values raise ValueError.
+    """
+    X = np.full((len(parsed), len(scorer.feature_columns)), np.nan, dtype=np.float32)
+    rows = [i for i, (sid, _) in enumerate(parsed) if sid is not None]
+    if rows:
+        ids, inverse = np.unique(np.array([parsed[i][0] for i in rows], dtype=np.int64), return_inverse=True)
+        X[rows] = scorer.matrix(ids, _load_signals(ids))[inverse]
+    for i, (_, features) in enumerate(parsed):
+        for column, value in features.items():
+            X[i, scorer.column_index[column]] = scorer.encode(column, value)
+    return X
+
+
+def score_instances(parsed: list[tuple[int | None, dict]]) -> dict:
+    """
+    Scores without writing anything. Raises ModelUnavailable without a LightGBM bundle.
+    model_version_id is None while no scoring run has registered the loaded bundle yet.
+    """
+    bundle, bundle_hash = model_registry.get_versioned()
+    scorer = compiled_scorer(bundle) if bundle is not None else None
+    if scorer is None:
+        raise ModelUnavailable()
+    version_id = model_versions.lookup(bundle, bundle_hash)
+
+    probs = score_batcher.predict(scorer, build_rows(scorer, parsed))
+    threshold = bundle.get("threshold", 0.5)
+    return {
+        "model_version_id": version_id,
+        "threshold": threshold,
+        "results": [
+            {"student_id": sid, "risk_probability": round(float(p), 6), "at_risk": bool(p >= threshold)}
+            for (sid, _), p in zip(parsed, probs)
+        ],
+    }
@@ -0,0 +1,144 @@
+"""
+Multi-core risk scoring for institution-wide runs.
+
+Student ids are sharded across a ProcessPoolExecutor. Each worker process
+builds its own app (own DB engine), loads the model bundle once in the pool
+initializer, and for every shard computes features + probabilities and sends
+back compact arrays (int64 ids, float32 probs, int16/float32 top contributions). The parent then performs a
+single chunked bulk upsert and one commit.
+
+Workers load the bundle from disk themselves, so each one checks that its
+file hash matches the parent's: a bundle replaced mid-run fails the run
+instead of writing scores tagged with the wrong model version.
+"""
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .. import db
+from .model_versions import model_versions
+from .predict import (
+    append_history, iter_scoring_chunks, iter_student_id_chunks, make_chunk_scorer, model_registry, scored_rows,
+    write_chunk_size,
+)
+from .risk_writer import upsert_risk_scores
+
+DEFAULT_SHARD_SIZE = 5000
+
+# per-worker-process state, set by _init_worker
+_worker_app = None
+_worker_score_chunk = None
+_worker_bundle_hash = None
+_expected_bundle_hash = None
+
+
+def _init_worker(expected_hash: str | None) -> None:
+    global _worker_app, _worker_score_chunk, _worker_bundle_hash, _expected_bundle_hash
+    from .. import create_app
+
+    _worker_app = create_app()
+    with _worker_app.app_context():
+        bundle, _worker_bundle_hash = model_registry.get_versioned()
+        _worker_score_chunk = make_chunk_scorer(bundle)
+    _expected_bundle_hash = expected_hash
+
+
+def _noop(_):
+    return None
+
+
+def _score_shard(ids: np.ndarray):
+    if _worker_bundle_hash != _expected_bundle_hash:
+        raise RuntimeError(
+            f"model bundle changed during the run (worker loaded {_worker_bundle_hash}, "
+            f"run started with {_expected_bundle_hash})"
+        )
+    with _worker_app.app_context():
+        id_list = ids.tolist()
+        probs, top = _worker_score_chunk(id_list)
+        db.session.remove()
+    return ids, np.asarray(probs, dtype=np.float32), top
+
+
+def _score_shards(
+    shards: list[np.ndarray], workers: int, bundle_hash: str | None
+) -> tuple[np.ndarray, np.ndarray, tuple[np.ndarray, np.ndarray] | None, dict]:
+    if not shards:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32), None, {"startup_s": 0.0, "score_s": 0.0}
+
+    # spawn (not fork): workers must not inherit the parent's DB connections
+    ctx = multiprocessing.get_context("spawn")
+    workers = max(1, int(workers))
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(bundle_hash,)
+    ) as pool:
+        # wait until every worker has initialized so startup is not counted as scoring time
+        list(pool.map(_noop, range(workers)))
+        t1 = time.perf_counter()
+        results = list(pool.map(_score_shard, shards))
+        t2 = time.perf_counter()
+
+    ids = np.concatenate([r[0] for r in results])
+    probs = np.concatenate([r[1] for r in results])
+    top = None
+    explained = [r[2] for r in results if r[2] is not None]
+    if explained:
+        # shards without an explained row come back as None
+        k = explained[0][0].shape[1]
+        parts = [
+            r[2] if r[2] is not None
+            else (np.full((len(r[0]), k), -1, dtype=np.int16), np.zeros((len(r[0]), k), dtype=np.float32))
+            for r in results
+        ]
+        top = (np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts]))
+    return ids, probs, top, {"startup_s": round(t1 - t0, 3), "score_s": round(t2 - t1, 3)}
+
+
+def score_in_process_pool(
+    student_ids: list[int] | None = None,
+    workers: int = 2,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+) -> tuple[np.ndarray, np.ndarray, tuple[np.ndarray, np.ndarray] | None, dict]:
+    """
+    Computes probabilities for the students without writing anything.
+    Must be called inside an app context (used to list ids).
+    Returns (ids int64, probs float32, top, timings); top is (feature idx, contribution)
+    arrays aligned with ids, or None for the fallback scorer.
+    """
+    shards = [np.asarray(ids, dtype=np.int64) for ids in iter_student_id_chunks(student_ids, max(1, int(shard_size)))]
+    _, bundle_hash = model_registry.get_versioned()
+    return _score_shards(shards, workers, bundle_hash)
+
+
+def run_parallel_risk_prediction(
+    student_ids: list[int] | None = None,
+    workers: int = 2,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+) -> dict:
+    """
+    Same semantics as run_batch_risk_prediction (latest row per student is
+    updated, otherwise inserted), but features/inference run on `workers` cores.
+    """
+    bundle, bundle_hash = model_registry.get_versioned()
+    version_id = model_versions.ensure(bundle, bundle_hash)
+    shards, versions = [], {}  # one id scan gives the shards and the inputs watermarks, read before any features
+    for ids, chunk_versions in iter_scoring_chunks(student_ids, max(1, int(shard_size))):
+        shards.append(np.asarray(ids, dtype=np.int64))
+        versions.update(chunk_versions)
+    ids, probs, top, timings = _score_shards(shards, workers, bundle_hash)
+
+    t0 = time.perf_counter()
+    created, updated = upsert_risk_scores(
+        scored_rows(ids.tolist(), probs.astype(np.float64), top),
+        model_version_id=version_id,
+        inputs_versions=versions,
+        chunk_size=write_chunk_size(),
+        append=append_history(),
+    )
+    db.session.commit()
+    timings["write_s"] = round(time.perf_counter() - t0, 3)
+
+    return {"generated": created + updated, "created": created, "updated": updated, "timings": timings}
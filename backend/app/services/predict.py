@@ -1,22 +1,36 @@
-import json
-from datetime import datetime
+import time
 from pathlib import Path
 
-import joblib
 import numpy as np
-import pandas as pd
+from flask import current_app
+from sqlalchemy import func, literal
 
 from .. import db
-from ..models import Student, RiskScore
+from ..models import RiskScore, Student
+from .contributions import CONTRIBUTION_MODES, explain, pack_rows
+from .features import _load_signals, build_feature_matrix
+from .metrics import observe_prediction_batch
+from .model_registry import ModelRegistry
+from .model_versions import model_versions
+from .native_scorer import compiled_scorer
+from .request_timing import timed
+from .risk_writer import DEFAULT_CHUNK_SIZE, upsert_risk_scores
+from .score_inputs import is_stale
 
 # Bundle produced by your training script
 # backend/app/services/predict.py -> parents[2] == backend/
 BUNDLE_PATH = Path(__file__).resolve().parents[2] / "models" / "risk_model.joblib"
 
+# One registry per worker process: the bundle is unpickled once and only
+# reloaded when train_lightgbm.py replaces the file.
+model_registry = ModelRegistry(BUNDLE_PATH)
+
+DEFAULT_SCORING_CHUNK_SIZE = 2000
+
 
 def _load_bundle():
     """
-    Loads the saved training bundle:
+    Returns the cached training bundle (see ModelRegistry):
       {
         "model": LGBMClassifier,
         "feature_columns": [...],
@@ -25,192 +39,201 @@ def _load_bundle():
         ...
       }
     """
-    if not BUNDLE_PATH.exists():
-        return None
-    try:
-        return joblib.load(BUNDLE_PATH)
-    except Exception:
-        # Keep service resilient: if bundle can't be loaded, fallback keeps app working
-        return None
+    # Keep service resilient: if bundle is missing or can't be loaded, fallback keeps app working
+    return model_registry.get()
 
 
-def _demo_feature_row_for_student(student_id: int, feature_cols: list[str], cat_cols: set[str]) -> dict:
-    """
-    MVP placeholder: later replace with real DB feature engineering.
-    For now, generate deterministic values per student id (stable between runs).
-    """
-    rng = np.random.default_rng(student_id)
+def current_model():
+    """(bundle or None, model_versions.id) of the model scores are produced with right now."""
+    bundle, bundle_hash = model_registry.get_versioned()
+    return bundle, model_versions.ensure(bundle, bundle_hash)
 
-    row: dict = {}
-    for f in feature_cols:
-        if f in cat_cols:
-            row[f] = f"cat_{student_id % 5}"  # deterministic category-like strings
-        else:
-            row[f] = float(rng.uniform(0, 1))
-    return row
 
+def write_chunk_size() -> int:
+    return int(current_app.config.get("RISK_WRITE_CHUNK_SIZE", DEFAULT_CHUNK_SIZE))
 
-def _ensure_df_schema(df: pd.DataFrame, feature_cols: list[str], cat_cols: set[str]) -> pd.DataFrame:
-    """
-    Ensures df has exactly feature_cols in the same order.
-    - creates missing cols with safe defaults
-    - drops extra cols
-    - sets categorical dtypes as 'category'
-    - coerces numeric cols safely
-    """
-    X = df.copy()
 
-    # add missing
-    for c in feature_cols:
-        if c not in X.columns:
-            X[c] = "unknown" if c in cat_cols else 0.0
+def append_history() -> bool:
+    return current_app.config.get("RISK_HISTORY_MODE", "overwrite") == "append"
 
-    # keep only in correct order
-    X = X[feature_cols]
 
-    # enforce categorical dtype + clean strings
-    for c in feature_cols:
-        if c in cat_cols:
-            X[c] = X[c].astype(str).str.strip().astype("category")
+def _contributions_mode() -> str:
+    mode = current_app.config.get("RISK_CONTRIBUTIONS", "at_risk")
+    if mode not in CONTRIBUTION_MODES:
+        raise ValueError(f"RISK_CONTRIBUTIONS must be one of {', '.join(CONTRIBUTION_MODES)}, got {mode!r}")
+    return mode
 
-    # numeric columns: coerce bad strings to NaN then fill with 0
-    for c in feature_cols:
-        if c not in cat_cols:
-            X[c] = pd.to_numeric(X[c], errors="coerce").fillna(0.0)
 
-    return X
+def _scoring_chunk_size() -> int:
+    return int(current_app.config.get("SCORING_CHUNK_SIZE", DEFAULT_SCORING_CHUNK_SIZE))
 
 
-def _preload_latest_risk_scores(student_ids: list[int]) -> dict[int, RiskScore]:
+def _student_chunks(student_ids: list[int] | None, chunk_size: int, *columns, latest_score: bool = False):
+    """
+    Yields lists of (Student.id, *columns) rows of existing students, ascending by id,
+    at most chunk_size each; latest_score=True outer-joins the student's latest RiskScore.
+    - student_ids=None: keyset scan over the whole students table (id > last ORDER BY id LIMIT n),
+      so no query ever materializes more than one chunk
+    - otherwise: the given ids (deduplicated), checked for existence one slice at a time
+    """
+    def query():
+        q = db.session.query(Student.id, *columns)
+        if latest_score:
+            q = q.outerjoin(RiskScore, RiskScore.id == Student.latest_risk_id)
+        return q
+
+    if student_ids is None:
+        last_id = 0
+        while True:
+            rows = query().filter(Student.id > last_id).order_by(Student.id.asc()).limit(chunk_size).all()
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1][0]
+    else:
+        wanted = sorted({int(i) for i in student_ids})
+        for start in range(0, len(wanted), chunk_size):
+            part = wanted[start:start + chunk_size]
+            rows = query().filter(Student.id.in_(part)).order_by(Student.id.asc()).all()
+            if rows:
+                yield rows
+
+
+def iter_student_id_chunks(student_ids: list[int] | None, chunk_size: int):
+    """Yields lists of existing student ids, ascending, at most chunk_size each (see _student_chunks)."""
+    for rows in _student_chunks(student_ids, chunk_size):
+        yield [row[0] for row in rows]
+
+
+def iter_scoring_chunks(student_ids: list[int] | None, chunk_size: int, stale_for: int | None = None):
     """
-    Avoid N+1 queries:
-    - fetch all risk scores for these students once
-    - pick the latest per student by generated_at
+    Like iter_student_id_chunks, but yields (ids, versions) where versions is
+    {student_id: inputs_version} for the students to score: all of them, or with
+    stale_for=<model_version_id> only those whose latest score is stale.
+    Still one query per chunk.
     """
-    if not student_ids:
-        return {}
+    flag = is_stale(stale_for) if stale_for is not None else literal(True)
+    for rows in _student_chunks(student_ids, chunk_size, Student.inputs_version, flag, latest_score=True):
+        yield [row[0] for row in rows], {sid: version for sid, version, todo in rows if todo}
 
-    rows = (
-        RiskScore.query.filter(RiskScore.student_id.in_(student_ids))
-        .order_by(RiskScore.student_id.asc(), RiskScore.generated_at.desc())
-        .all()
-    )
 
-    latest: dict[int, RiskScore] = {}
-    for rs in rows:
-        if rs.student_id not in latest:
-            latest[rs.student_id] = rs
-    return latest
+def _count_students(student_ids: list[int] | None) -> int:
+    if student_ids is None:
+        return db.session.query(func.count(Student.id)).scalar() or 0
+    return len(set(student_ids))
 
 
-def run_batch_risk_prediction(student_ids: list[int] | None = None) -> int:
+def _fallback_probs(ids: list[int]) -> tuple[np.ndarray, None]:
+    """Deterministic fallback if model bundle is missing (no local explanations)."""
+    return (np.asarray(ids, dtype=np.int64) * 37 % 100) / 100.0, None
+
+
+def make_chunk_scorer(bundle):
     """
-    Predicts risk for students and upserts into risk_scores:
-    - If a RiskScore exists for a student, update the latest row (and refresh generated_at)
-    - Else, create a new RiskScore row
+    Returns score_chunk(ids) -> (probs, top) aligned with ids, where probs are
+    dropout probabilities and top is (feature idx int16[n, k], contribution float32[n, k])
+    for each student's strongest local factors (-1 for rows RISK_CONTRIBUTIONS leaves
+    unexplained), or None.
+    bundle=None gives the deterministic fallback scorer.
     """
-    bundle = _load_bundle()
     if bundle is None:
         # keep app functional even if model not present on teammate machine
-        return _fallback_batch(student_ids)
+        return _fallback_probs
 
     model = bundle["model"]
     feature_cols: list[str] = bundle["feature_columns"]
     cat_cols = set(bundle.get("categorical_features", []))
-
-    q = Student.query
-    if student_ids:
-        q = q.filter(Student.id.in_(student_ids))
-    students = q.all()
-    if not students:
-        return 0
-
-    student_id_list = [s.id for s in students]
-    existing_by_student = _preload_latest_risk_scores(student_id_list)
-
-    # Build demo feature rows (replace later with real DB feature engineering)
-    rows = [_demo_feature_row_for_student(s.id, feature_cols, cat_cols) for s in students]
-    X = _ensure_df_schema(pd.DataFrame(rows), feature_cols, cat_cols)
-
-    probs = model.predict_proba(X)[:, 1]
-    # If later you store a binary prediction, you can use:
-    # preds = (probs >= threshold).astype(int)
-
-    # Global feature importance (simple MVP XAI)
-    importances = getattr(model, "feature_importances_", None)
-    top_json = None
-    if importances is not None:
-        top_idx = np.argsort(importances)[::-1][:6]
-        top_factors = [{"feature": feature_cols[i], "importance": float(importances[i])} for i in top_idx]
-        top_json = json.dumps(top_factors)
-
-    created_or_updated = 0
-
-    for s, p in zip(students, probs, strict=False):
-        existing = existing_by_student.get(s.id)
-
-        if existing:
-            existing.risk_probability = float(p)
-            existing.top_factors_json = top_json
-            existing.generated_at = datetime.utcnow()  # keep consistent with model default
+    threshold = bundle.get("threshold", 0.5)
+    native = compiled_scorer(bundle)
+    mode = _contributions_mode()
+
+    def score_chunk(ids):
+        # Features come from a few aggregate queries, already in model column order
+        if native is not None:
+            ids_arr = np.asarray(list(ids), dtype=np.int64)
+            X = native.matrix(ids_arr, _load_signals(ids_arr))
         else:
-            rs = RiskScore(
-                student_id=s.id,
-                risk_probability=float(p),
-                top_factors_json=top_json,
-            )
-            db.session.add(rs)
-            existing_by_student[s.id] = rs  # keep dict consistent within this run
+            X = build_feature_matrix(ids, feature_cols, cat_cols)
+        t0 = time.perf_counter()
+        with timed("model"):
+            # not a LightGBM bundle: predict_proba, and no local explanations
+            probs = native.booster.predict(X) if native is not None else model.predict_proba(X)[:, 1]
+        observe_prediction_batch(len(ids), time.perf_counter() - t0)
+        if native is None:
+            return probs, None
+        with timed("explain"):
+            # separate TreeSHAP pass, only over the rows RISK_CONTRIBUTIONS selects
+            return probs, explain(native.booster, X, probs, threshold, mode)
+
+    return score_chunk
+
+
+def scored_rows(ids: list[int], probs: np.ndarray, top) -> zip:
+    """(student_id, probability, packed top contributions or None) rows for upsert_risk_scores."""
+    packed = pack_rows(*top) if top is not None else [None] * len(ids)
+    return zip(ids, probs.tolist(), packed)
+
+
+def run_batch_risk_prediction(
+    student_ids: list[int] | None = None,
+    chunk_size: int | None = None,
+    progress=None,
+    incremental: bool = False,
+) -> dict:
+    """
+    Predicts risk for students and upserts into risk_scores:
+    - If a RiskScore exists for a student, update the latest row (and refresh generated_at)
+    - Else, create a new RiskScore row
+    (RISK_HISTORY_MODE=append: always create a row, keeping the history)
+    Every written row references the model version that produced it and, for the
+    rows RISK_CONTRIBUTIONS selects (default: at risk), the student's top-k feature
+    contributions.
 
-        created_or_updated += 1
+    student_ids=None scores the whole students table. Students are processed in
+    id-ordered chunks of chunk_size (default SCORING_CHUNK_SIZE): features, predict
+    and write happen per chunk, followed by a commit, so peak memory is bounded by
+    one chunk and a failure only rolls back the chunk in flight.
 
-    db.session.commit()
-    return created_or_updated
+    incremental=True only re-scores students whose latest score is stale (see
+    score_inputs.py); the others are only counted as skipped.
 
+    progress: optional callable receiving {"processed", "total", "rescored",
+    "skipped", "created", "updated"} after every chunk.
 
-def _fallback_batch(student_ids: list[int] | None) -> int:
-    """
-    Deterministic fallback if model bundle is missing.
-    Still does upsert + refresh generated_at for consistency.
+    Returns {"generated": n, "rescored": n, "skipped": s, "created": c, "updated": u}.
     """
-    q = Student.query
-    if student_ids:
-        q = q.filter(Student.id.in_(student_ids))
-    students = q.all()
-    if not students:
-        return 0
-
-    student_id_list = [s.id for s in students]
-    existing_by_student = _preload_latest_risk_scores(student_id_list)
-
-    top = json.dumps(
-        [
-            {"feature": "Grade_1st_Sem", "importance": 0.42},
-            {"feature": "Attendance", "importance": 0.31},
-            {"feature": "LMS_Logins", "importance": 0.27},
-        ]
-    )
-
-    created_or_updated = 0
-
-    for s in students:
-        p = (s.id * 37 % 100) / 100.0
-        existing = existing_by_student.get(s.id)
-
-        if existing:
-            existing.risk_probability = float(p)
-            existing.top_factors_json = top
-            existing.generated_at = datetime.utcnow()
-        else:
-            rs = RiskScore(
-                student_id=s.id,
-                risk_probability=float(p),
-                top_factors_json=top,
+    bundle, version_id = current_model()
+    score_chunk = make_chunk_scorer(bundle)
+
+    chunk_size = max(1, int(chunk_size or _scoring_chunk_size()))
+    total = _count_students(student_ids) if progress else None
+    stats = {"processed": 0, "total": total, "rescored": 0, "skipped": 0, "created": 0, "updated": 0}
+
+    # watermarks are read before the features (see score_inputs.py)
+    for ids, versions in iter_scoring_chunks(student_ids, chunk_size, version_id if incremental else None):
+        stats["processed"] += len(ids)
+        stats["skipped"] += len(ids) - len(versions)
+        if versions:
+            todo = [sid for sid in ids if sid in versions]
+            probs, top = score_chunk(todo)
+            created, updated = upsert_risk_scores(
+                scored_rows(todo, probs, top),
+                model_version_id=version_id,
+                inputs_versions=versions,
+                chunk_size=write_chunk_size(),
+                append=append_history(),
             )
-            db.session.add(rs)
-            existing_by_student[s.id] = rs
-
-        created_or_updated += 1
-
-    db.session.commit()
-    return created_or_updated
+            db.session.commit()
+            stats["rescored"] += len(todo)
+            stats["created"] += created
+            stats["updated"] += updated
+        if progress:
+            progress(dict(stats))
+
+    return {
+        "generated": stats["created"] + stats["updated"],
+        "rescored": stats["rescored"],
+        "skipped": stats["skipped"],
+        "created": stats["created"],
+        "updated": stats["updated"],
+    }
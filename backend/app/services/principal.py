@@ -0,0 +1,131 @@
+"""
+Who is calling, resolved from the signed JWT claims.
+
+login embeds the profile ids the routes need (advisor_id / student_id), the
+display name and the user's token_version. Guards turn the claims into a
+Principal on flask.g, so protected reads run no identity queries.
+
+Revocation: anything that changes a user's identity (password, role, profile
+reassignment, deactivation) must call bump_token_version(user_id); POST
+/api/logout does, and User.set_password bumps the column for existing users.
+Tokens carrying an older version are rejected. Current versions are cached per
+process for TOKEN_VERSION_TTL_SECONDS, so other workers notice within that window;
+the cache keeps at most TOKEN_VERSION_CACHE_MAX_ENTRIES users (least recently
+used first out) and drops expired entries when they are read.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from flask import current_app
+from sqlalchemy import update
+
+from .. import db
+from ..models import Advisor, Student, User
+
+DEFAULT_TTL_SECONDS = 30.0
+DEFAULT_MAX_ENTRIES = 10000
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    user_id: int
+    role: str
+    email: str | None = None
+    name: str | None = None
+    advisor_id: int | None = None
+    student_id: int | None = None
+
+
+class _TokenVersionCache:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data: OrderedDict[int, tuple[int | None, float]] = OrderedDict()  # user_id -> (version, fetched_at)
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, ttl: float) -> int | None:
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is not None:
+                if time.monotonic() - entry[1] < ttl:
+                    self._data.move_to_end(user_id)
+                    return entry[0]
+                del self._data[user_id]
+        version = db.session.query(User.token_version).filter_by(id=user_id).scalar()  # None: user gone
+        self.put(user_id, version)
+        return version
+
+    def put(self, user_id: int, version: int | None) -> None:
+        with self._lock:
+            self._data[user_id] = (version, time.monotonic())
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def forget(self, user_id: int) -> None:
+        with self._lock:
+            self._data.pop(user_id, None)
+
+
+token_versions = _TokenVersionCache()
+
+
+def identity_claims(user: User) -> dict:
+    """Claims for create_access_token(additional_claims=...); user.student / user.advisor should be loaded."""
+    claims = {"role": user.role, "email": user.email, "tv": user.token_version or 0}
+    if user.role == "advisor" and user.advisor is not None:
+        claims["advisor_id"] = user.advisor.id
+        claims["name"] = user.advisor.name
+    elif user.role == "student" and user.student is not None:
+        claims["student_id"] = user.student.id
+        claims["name"] = user.student.name
+    token_versions.put(user.id, claims["tv"])  # the next request from this user needs no lookup
+    return claims
+
+
+def _legacy_principal(user_id: int, claims: dict) -> Principal | None:
+    """Tokens issued before identity claims existed: resolve the profile from the DB."""
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    advisor = db.session.query(Advisor.id, Advisor.name).filter_by(user_id=user_id).first()
+    student = db.session.query(Student.id, Student.name).filter_by(user_id=user_id).first()
+    profile = advisor if user.role == "advisor" else student
+    return Principal(
+        user_id=user_id,
+        role=claims.get("role") or user.role,
+        email=user.email,
+        name=profile[1] if profile else None,
+        advisor_id=advisor[0] if advisor else None,
+        student_id=student[0] if student else None,
+    )
+
+
+def resolve_principal(identity, claims: dict) -> Principal | None:
+    """Principal for a verified token, or None when it has been revoked."""
+    user_id = int(identity)
+    if "tv" not in claims:
+        return _legacy_principal(user_id, claims)
+
+    ttl = float(current_app.config.get("TOKEN_VERSION_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+    if token_versions.get(user_id, ttl) != claims["tv"]:
+        return None
+
+    return Principal(
+        user_id=user_id,
+        role=claims.get("role"),
+        email=claims.get("email"),
+        name=claims.get("name"),
+        advisor_id=claims.get("advisor_id"),
+        student_id=claims.get("student_id"),
+    )
+
+
+def bump_token_version(user_id: int) -> None:
+    """Revokes the user's existing tokens. Same transaction as the change; does NOT commit."""
+    db.session.execute(
+        update(User).where(User.id == user_id).values(token_version=User.token_version + 1),
+        execution_options={"synchronize_session": False},
+    )
+    token_versions.forget(user_id)
@@ -0,0 +1,165 @@
+"""
+Per-request instrumentation.
+
+- SQLAlchemy engine events count statements and time spent in the database
+- timed("model") / timed("serialize") sections add to the same per-request tally
+- every response gets a Server-Timing header (db, model, serialize, total) and
+  one structured JSON log line on the "pass.requests" logger
+- views may declare a query budget with @query_budget(n); going over it logs a
+  warning, or raises QueryBudgetExceeded when QUERY_BUDGET_ENFORCE is on (tests).
+  Statements run inside budget_exempt() (the guards' identity check, which only
+  hits the DB on a cold token-version cache) are timed but not counted against it
+
+Outside a request (background jobs, scripts) all of this is a no-op.
+"""
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+
+from .. import db
+
+logger = logging.getLogger("pass.requests")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(max_queries: int):
+    """Declares the maximum number of SQL statements one call of the view may run."""
+    def decorator(fn):
+        fn._query_budget = max_queries
+        return fn
+    return decorator
+
+
+def _stats():
+    if not has_request_context():
+        return None
+    return g.get("_timing")
+
+
+@contextmanager
+def timed(phase: str):
+    """Adds the wall time of the block to the current request's phase (ms)."""
+    stats = _stats()
+    if stats is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats[phase] = stats.get(phase, 0.0) + (time.perf_counter() - t0) * 1000.0
+
+
+@contextmanager
+def budget_exempt():
+    """Statements in the block still show in Server-Timing but do not count toward @query_budget."""
+    stats = _stats()
+    if stats is None:
+        yield
+        return
+    outer = stats["exempting"]
+    stats["exempting"] = True
+    try:
+        yield
+    finally:
+        stats["exempting"] = outer
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        with timed("serialize"):
+            return super().dumps(obj, **kwargs)
+
+
+# -----------------------
+# Engine events
+# -----------------------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _stats() is not None:
+        conn.info.setdefault("_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _stats()
+    if stats is None:
+        return
+    starts = conn.info.get("_query_start")
+    if starts:
+        stats["db"] += (time.perf_counter() - starts.pop()) * 1000.0
+    stats["queries"] += 1
+    if stats["exempting"]:
+        stats["exempt"] += 1
+
+
+# -----------------------
+# Request hooks
+# -----------------------
+def _start_request():
+    g._timing = {
+        "start": time.perf_counter(), "queries": 0, "exempt": 0, "exempting": False,
+        "db": 0.0, "model": 0.0, "serialize": 0.0,
+    }
+
+
+def _finish_request(response):
+    stats = _stats()
+    if stats is None:
+        return response
+    total = (time.perf_counter() - stats["start"]) * 1000.0
+
+    response.headers["Server-Timing"] = ", ".join([
+        f'db;dur={stats["db"]:.2f};desc="{stats["queries"]} queries"',
+        f'model;dur={stats["model"]:.2f}',
+        f'serialize;dur={stats["serialize"]:.2f}',
+        f"total;dur={total:.2f}",
+    ])
+
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "endpoint": request.endpoint,
+            "status": response.status_code,
+            "duration_ms": round(total, 2),
+            "db_ms": round(stats["db"], 2),
+            "db_queries": stats["queries"],
+            "model_ms": round(stats["model"], 2),
+            "serialize_ms": round(stats["serialize"], 2),
+        }))
+
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, "_query_budget", None)
+    counted = stats["queries"] - stats["exempt"]
+    if budget is not None and counted > budget:
+        msg = f"{request.endpoint} ran {counted} queries (budget {budget})"
+        if current_app.config.get("QUERY_BUDGET_ENFORCE"):
+            raise QueryBudgetExceeded(msg)
+        logger.warning(msg)
+
+    return response
+
+
+def init_request_timing(app) -> None:
+    app.json = TimedJSONProvider(app)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+    if app.config.get("REQUEST_LOG") and not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
@@ -0,0 +1,112 @@
+"""
+Conditional GET + serialized-response cache for advisor read endpoints.
+
+Every advisor row carries a data_version counter, bumped in the same
+transaction as any prediction batch or intervention write touching that
+advisor's students. The advisor id comes from the token claims; the version
+itself is one primary-key lookup per request.
+
+- ETag = hash(path + query string + advisor id + data_version)
+- If-None-Match hit  -> 304, payload queries are skipped entirely
+- otherwise the serialized body is looked up in a bounded per-process LRU,
+  and only built (and stored) on a miss
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import current_app, request
+from sqlalchemy import or_, select, update
+
+from .. import db
+from ..models import Advisor, Student
+
+DEFAULT_MAX_ENTRIES = 512
+
+
+class ResponseLRU:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            body = self._data.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key: str, body: bytes) -> None:
+        with self._lock:
+            self._data[key] = body
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._data), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+
+response_cache = ResponseLRU()
+
+
+def bump_advisor_versions(student_ids=None, advisor_ids=None) -> None:
+    """
+    Invalidate cached reads for the advisors owning student_ids (and/or the
+    given advisor_ids). One UPDATE; does NOT commit, so it lands in the same
+    transaction as the write that caused it.
+    """
+    conditions = []
+    if student_ids:
+        conditions.append(
+            Advisor.id.in_(select(Student.advisor_id).where(Student.id.in_(list(student_ids))))
+        )
+    if advisor_ids:
+        conditions.append(Advisor.id.in_(list(advisor_ids)))
+    if not conditions:
+        return
+    stmt = update(Advisor).where(or_(*conditions)).values(data_version=Advisor.data_version + 1)
+    db.session.execute(stmt, execution_options={"synchronize_session": False})
+
+
+def _etag_for(advisor_id: int, data_version: int) -> str:
+    key = f"{request.path}?{request.query_string.decode()}|a{advisor_id}|v{data_version or 0}"
+    return hashlib.sha1(key.encode()).hexdigest()[:20]
+
+
+def cached_advisor_response(advisor_id: int, build):
+    """
+    build() -> (payload dict, status). Only 200 responses are cached.
+    Costs one primary-key lookup of advisors.data_version when the response is cached.
+    """
+    data_version = db.session.query(Advisor.data_version).filter_by(id=advisor_id).scalar()
+    if data_version is None:
+        return {"error": "Advisor profile missing"}, 404
+    etag = _etag_for(advisor_id, data_version)
+
+    if etag in request.if_none_match:
+        resp = current_app.response_class(status=304)
+    else:
+        body = response_cache.get(etag)
+        if body is None:
+            payload, status = build()
+            if status != 200:
+                return payload, status
+            body = current_app.json.dumps(payload).encode() + b"\n"
+            response_cache.put(etag, body)
+        resp = current_app.response_class(body, status=200, mimetype="application/json")
+
+    resp.set_etag(etag)
+    # clients must revalidate every time; the 304 path is cheap
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
@@ -0,0 +1,182 @@
+"""
+Risk history: downsampled trends and retention compaction.
+
+With RISK_HISTORY_MODE=append every scoring run adds a RiskScore row per
+student. Trends are bucketed in SQL (day / week / month) over those raw rows
+plus risk_score_aggregates, where compact_risk_history() folds raw rows older
+than RISK_RETENTION_DAYS into one row per student and week (count, sum, min,
+max). A student's latest row is never compacted, so Student.latest_risk_id
+stays valid. Compacted weeks show up as one point even in daily trends.
+"""
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, func, literal_column, select
+
+from .. import db
+from ..models import RiskScore, RiskScoreAggregate, Student
+from .predict import iter_student_id_chunks
+from .response_cache import bump_advisor_versions
+
+BUCKETS = ("day", "week", "month")
+DEFAULT_RETENTION_DAYS = 90
+DEFAULT_COMPACT_CHUNK_SIZE = 5000
+
+
+def _dialect() -> str:
+    return db.session.get_bind().dialect.name
+
+
+def bucket_expr(column, bucket: str):
+    """SQL expression truncating a timestamp to the start of its day / week (Monday) / month."""
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+    if _dialect() == "postgresql":
+        # literal unit: a bound parameter would make SELECT and GROUP BY differ
+        return func.date_trunc(literal_column(f"'{bucket}'"), column)
+    if bucket == "day":
+        return func.date(column)
+    if bucket == "week":
+        return func.date(column, "weekday 0", "-6 days")  # next Sunday (or today), back to Monday
+    return func.strftime("%Y-%m-01", column)
+
+
+def _as_date(value) -> date:
+    # SQLite returns 'YYYY-MM-DD' strings, Postgres returns timestamps
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _week_start(ts: datetime) -> datetime:
+    return datetime.combine(ts.date() - timedelta(days=ts.weekday()), datetime.min.time())
+
+
+# -----------------------
+# Trend
+# -----------------------
+def risk_trend(student_id: int, bucket: str = "week", since: datetime | None = None) -> list[dict]:
+    """
+    [{"period_start", "count", "avg", "min", "max"}] ascending, from raw rows
+    and compacted aggregates. Two grouped queries, both served by
+    (student_id, ...) indexes.
+    """
+    b = bucket_expr(RiskScore.generated_at, bucket)
+    raw = select(
+        b, func.count(RiskScore.id), func.sum(RiskScore.risk_probability),
+        func.min(RiskScore.risk_probability), func.max(RiskScore.risk_probability),
+    ).where(RiskScore.student_id == student_id)
+    if since is not None:
+        raw = raw.where(RiskScore.generated_at >= since)
+
+    a = bucket_expr(RiskScoreAggregate.period_start, bucket)
+    agg = select(
+        a, func.sum(RiskScoreAggregate.score_count), func.sum(RiskScoreAggregate.probability_sum),
+        func.min(RiskScoreAggregate.probability_min), func.max(RiskScoreAggregate.probability_max),
+    ).where(RiskScoreAggregate.student_id == student_id)
+    if since is not None:
+        agg = agg.where(RiskScoreAggregate.period_start >= _week_start(since))
+
+    points: dict[date, list] = {}
+    for query, expr in ((raw, b), (agg, a)):
+        for key, count, total, low, high in db.session.execute(query.group_by(expr)):
+            p = points.setdefault(_as_date(key), [0, 0.0, low, high])
+            p[0] += int(count)
+            p[1] += float(total)
+            p[2] = min(p[2], low)
+            p[3] = max(p[3], high)
+
+    return [
+        {
+            "period_start": day.isoformat(),
+            "count": count,
+            "avg": round(total / count, 6),
+            "min": float(low),
+            "max": float(high),
+        }
+        for day, (count, total, low, high) in sorted(points.items())
+    ]
+
+
+# -----------------------
+# Retention
+# -----------------------
+def _merge_aggregates_statement():
+    table = RiskScoreAggregate.__table__
+    if _dialect() == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        lower, upper = func.min, func.max  # scalar min()/max() with two arguments
+    else:
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        lower, upper = func.least, func.greatest
+
+    stmt = dialect_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.student_id, table.c.period_start],
+        set_={
+            "score_count": table.c.score_count + stmt.excluded.score_count,
+            "probability_sum": table.c.probability_sum + stmt.excluded.probability_sum,
+            "probability_min": lower(table.c.probability_min, stmt.excluded.probability_min),
+            "probability_max": upper(table.c.probability_max, stmt.excluded.probability_max),
+        },
+    )
+
+
+def compact_risk_history(
+    older_than_days: int | None = None,
+    chunk_size: int = DEFAULT_COMPACT_CHUNK_SIZE,
+    progress=None,
+) -> dict:
+    """
+    Folds RiskScore rows generated before the cutoff (start of the week
+    older_than_days ago, default RISK_RETENTION_DAYS) into weekly aggregates
+    and deletes them. Works through students in id chunks with one commit each.
+    progress: optional callable receiving the running totals after every chunk.
+    """
+    if older_than_days is None:
+        older_than_days = int(current_app.config.get("RISK_RETENTION_DAYS", DEFAULT_RETENTION_DAYS))
+    cutoff = _week_start(datetime.utcnow() - timedelta(days=older_than_days))
+    merge = _merge_aggregates_statement()
+    week = bucket_expr(RiskScore.generated_at, "week")
+    stats = {"cutoff": cutoff.isoformat(), "students": 0, "compacted": 0, "aggregates": 0}
+
+    for ids in iter_student_id_chunks(None, max(1, int(chunk_size))):
+        latest = select(Student.latest_risk_id).where(Student.id.in_(ids), Student.latest_risk_id.is_not(None))
+        old = (
+            RiskScore.student_id.in_(ids),
+            RiskScore.generated_at < cutoff,
+            RiskScore.id.not_in(latest),
+        )
+        grouped = db.session.execute(
+            select(
+                RiskScore.student_id, week, func.count(RiskScore.id), func.sum(RiskScore.risk_probability),
+                func.min(RiskScore.risk_probability), func.max(RiskScore.risk_probability),
+            ).where(*old).group_by(RiskScore.student_id, week)
+        ).all()
+
+        stats["students"] += len(ids)
+        if grouped:
+            db.session.execute(merge, [
+                {
+                    "student_id": sid,
+                    "period_start": datetime.combine(_as_date(key), datetime.min.time()),
+                    "score_count": int(count),
+                    "probability_sum": float(total),
+                    "probability_min": float(low),
+                    "probability_max": float(high),
+                }
+                for sid, key, count, total, low, high in grouped
+            ])
+            removed = db.session.execute(
+                delete(RiskScore).where(*old), execution_options={"synchronize_session": False}
+            ).rowcount
+            bump_advisor_versions(student_ids=sorted({row[0] for row in grouped}))
+            stats["compacted"] += removed
+            stats["aggregates"] += len(grouped)
+        db.session.commit()
+        if progress:
+            progress(dict(stats))
+
+    return stats
@@ -0,0 +1,174 @@
+"""
+Bulk write layer for RiskScore rows.
+
+Keeps the "latest row per student" semantics of the original ORM loop:
+  - if a student already has RiskScore rows, the latest one (by generated_at)
+    is overwritten in place and its generated_at refreshed
+  - otherwise a new row is inserted
+but writes with Core statements in chunks instead of tracking one ORM object
+per student:
+  - Postgres / SQLite: INSERT ... ON CONFLICT (id) DO UPDATE for existing rows
+  - other dialects: executemany UPDATE
+  - new rows: executemany INSERT
+  - Student.latest_risk_id is re-pointed with one set-based UPDATE per chunk
+  - the owning advisors' data_version is bumped (invalidates cached reads)
+
+With append=True (RISK_HISTORY_MODE=append) every run inserts, keeping history.
+"""
+from datetime import datetime
+
+from sqlalchemy import func, and_, insert, update, bindparam, select
+
+from .. import db
+from ..models import RiskScore, Student
+from .response_cache import bump_advisor_versions
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def _latest_ids(student_ids: list[int]) -> dict[int, int]:
+    """Return {student_id: id of latest RiskScore} in ONE query."""
+    subq = (
+        db.session.query(
+            RiskScore.student_id.label("student_id"),
+            func.max(RiskScore.generated_at).label("max_gen"),
+        )
+        .filter(RiskScore.student_id.in_(student_ids))
+        .group_by(RiskScore.student_id)
+        .subquery()
+    )
+    rows = (
+        db.session.query(RiskScore.student_id, RiskScore.id)
+        .join(
+            subq,
+            and_(
+                RiskScore.student_id == subq.c.student_id,
+                RiskScore.generated_at == subq.c.max_gen,
+            ),
+        )
+        .all()
+    )
+    return {sid: rid for sid, rid in rows}
+
+
+def refresh_latest_risk_pointers(student_ids: list[int] | None = None) -> int:
+    """
+    Points Student.latest_risk_id at each student's newest RiskScore
+    (generated_at DESC, id DESC) with a single correlated UPDATE.
+    student_ids=None backfills every student. Does NOT commit.
+    """
+    newest = (
+        select(RiskScore.id)
+        .where(RiskScore.student_id == Student.id)
+        .order_by(RiskScore.generated_at.desc(), RiskScore.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    stmt = update(Student).values(latest_risk_id=newest)
+    if student_ids is not None:
+        stmt = stmt.where(Student.id.in_(student_ids))
+    return db.session.execute(stmt, execution_options={"synchronize_session": False}).rowcount
+
+
+def _upsert_statement():
+    table = RiskScore.__table__
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return (
+            update(table)
+            .where(table.c.id == bindparam("_id"))
+            .values(
+                risk_probability=bindparam("risk_probability"),
+                model_version_id=bindparam("model_version_id"),
+                inputs_version=bindparam("inputs_version"),
+                top_contributions=bindparam("top_contributions"),
+                top_factors_json=None,
+                generated_at=bindparam("generated_at"),
+            )
+        ), True
+
+    stmt = dialect_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={
+            "risk_probability": stmt.excluded.risk_probability,
+            "model_version_id": stmt.excluded.model_version_id,
+            "inputs_version": stmt.excluded.inputs_version,
+            "top_contributions": stmt.excluded.top_contributions,
+            "top_factors_json": None,
+            "generated_at": stmt.excluded.generated_at,
+        },
+    )
+    return stmt, False
+
+
+def upsert_risk_scores(
+    scores,
+    model_version_id: int | None = None,
+    inputs_versions: dict[int, int] | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    append: bool = False,
+) -> tuple[int, int]:
+    """
+    scores: iterable of (student_id, risk_probability) pairs, or of
+    (student_id, risk_probability, top_contributions) triples (packed bytes, see contributions.py).
+    model_version_id: model_versions row that produced them (see model_versions.py);
+    overwritten rows drop their legacy top_factors_json copy.
+    inputs_versions: {student_id: Student.inputs_version read before the features}.
+    append: insert a new row for every student instead (history mode); the
+    pointers move to the new rows and nothing is reported as updated.
+
+    Does NOT commit: callers decide the transaction boundary.
+    Returns (created, updated).
+    """
+    # one row per student (last value wins), like the ORM loop over unique students
+    scores = list({int(row[0]): row for row in scores}.values())
+    if not scores:
+        return 0, 0
+
+    table = RiskScore.__table__
+    upsert_stmt, by_bindparam = _upsert_statement()
+    id_key = "_id" if by_bindparam else "id"
+    chunk_size = max(1, int(chunk_size))
+
+    created = updated = 0
+    for start in range(0, len(scores), chunk_size):
+        chunk = scores[start:start + chunk_size]
+        latest = {} if append else _latest_ids([row[0] for row in chunk])
+        now = datetime.utcnow()  # keep consistent with model default
+
+        to_update, to_insert = [], []
+        for row in chunk:
+            sid, p = int(row[0]), float(row[1])
+            values = {
+                "student_id": sid,
+                "risk_probability": p,
+                "model_version_id": model_version_id,
+                "inputs_version": inputs_versions.get(sid) if inputs_versions else None,
+                "top_contributions": row[2] if len(row) > 2 else None,
+                "generated_at": now,
+            }
+            rid = latest.get(sid)
+            if rid is None:
+                to_insert.append(values)
+            else:
+                values[id_key] = rid
+                to_update.append(values)
+
+        if to_update:
+            db.session.execute(upsert_stmt, to_update)
+        if to_insert:
+            db.session.execute(insert(table), to_insert)
+        chunk_ids = [row[0] for row in chunk]
+        refresh_latest_risk_pointers(chunk_ids)
+        bump_advisor_versions(student_ids=chunk_ids)
+
+        created += len(to_insert)
+        updated += len(to_update)
+
+    return created, updated
@@ -0,0 +1,40 @@
+"""
+Dirty tracking for incremental risk scoring.
+
+Student.inputs_version is a per-student watermark: every write that changes a
+scoring input (the student's profile, their exam responses, interventions)
+must call mark_inputs_changed() in the same transaction. Each RiskScore keeps
+the watermark its features were read at plus its model_version_id, so a
+student needs re-scoring only when
+  - they have no score yet, or
+  - the score came from another model version, or
+  - their inputs_version has moved past the score's.
+The watermark is read before the features, so a change that lands mid-run
+leaves the new score stale rather than silently skipped.
+"""
+from sqlalchemy import or_, update
+
+from .. import db
+from ..models import RiskScore, Student
+
+
+def mark_inputs_changed(student_ids) -> None:
+    """Bumps inputs_version for the students. One UPDATE; does NOT commit."""
+    ids = sorted({int(i) for i in student_ids})
+    if not ids:
+        return
+    db.session.execute(
+        update(Student).where(Student.id.in_(ids)).values(inputs_version=Student.inputs_version + 1),
+        execution_options={"synchronize_session": False},
+    )
+
+
+def is_stale(model_version_id: int):
+    """Condition on Student outer-joined to its latest RiskScore: True when it needs re-scoring."""
+    return or_(
+        RiskScore.id.is_(None),
+        RiskScore.model_version_id.is_(None),
+        RiskScore.model_version_id != model_version_id,
+        RiskScore.inputs_version.is_(None),
+        RiskScore.inputs_version != Student.inputs_version,
+    )
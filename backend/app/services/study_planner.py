@@ -1,49 +1,83 @@
-from collections import defaultdict
-from ..models import ExamBlueprint, StudentResponse, Resource
+import numpy as np
+
+from ..models import StudentResponse
 from .. import db
+from .catalog_cache import RESOURCES_PER_TOPIC, UNKNOWN_TOPIC, catalog_cache
+
+
+def _topic_stats(student_id: int, exam_id: int, blueprint):
+    """
+    Per-topic (topic, correct, total) for one student.
+    Fetches only (question_id, is_correct) for the student's responses and maps
+    them to topics through the cached, array-backed blueprint; tallies with bincount.
+    Questions missing from the blueprint are reported under "Unknown".
+    Topics come back in exam question order (stable tie order).
+    """
+    rows = (
+        db.session.query(StudentResponse.question_id, StudentResponse.is_correct)
+        .filter_by(exam_id=exam_id, student_id=student_id)
+        .order_by(StudentResponse.question_id)
+        .all()
+    )
+    if not rows:
+        return []
+
+    qids = np.fromiter((r[0] for r in rows), dtype=np.int32, count=len(rows))
+    correct = np.fromiter((bool(r[1]) for r in rows), dtype=bool, count=len(rows))
+
+    codes = blueprint.codes_for(qids).astype(np.int64)
+    unknown = len(blueprint.topics)
+    codes[codes < 0] = unknown  # extra bucket for "Unknown"
+
+    totals = np.bincount(codes, minlength=unknown + 1)
+    corrects = np.bincount(codes, weights=correct, minlength=unknown + 1)
+
+    # first appearance order of each topic in question order
+    _, first = np.unique(codes, return_index=True)
+    order = codes[np.sort(first)]
+
+    names = blueprint.topics + (UNKNOWN_TOPIC,)
+    return [(names[c], int(corrects[c]), int(totals[c])) for c in order]
+
 
 def build_study_plan_for_student(student_id: int, exam_id: int) -> dict:
-    # Load blueprint: question -> topic
-    blueprint = ExamBlueprint.query.filter_by(exam_id=exam_id).all()
-    if not blueprint:
+    # Blueprint (question -> topic) comes from the per-process catalog cache
+    blueprint = catalog_cache.blueprint(exam_id)
+    if not len(blueprint):
         return {"error": "No blueprint found for exam_id"}, 404
 
-    q_to_topic = {b.question_id: b.topic_tag for b in blueprint}
-
-    responses = StudentResponse.query.filter_by(exam_id=exam_id, student_id=student_id).all()
-    if not responses:
+    stats = _topic_stats(student_id, exam_id, blueprint)
+    if not stats:
         return {"error": "No responses found for this exam/student"}, 404
 
-    stats = defaultdict(lambda: {"correct": 0, "total": 0})
-    for r in responses:
-        topic = q_to_topic.get(r.question_id, "Unknown")
-        stats[topic]["total"] += 1
-        stats[topic]["correct"] += 1 if r.is_correct else 0
-
     topic_scores = []
-    for topic, s in stats.items():
-        pct = 0.0 if s["total"] == 0 else (s["correct"] / s["total"]) * 100.0
-        topic_scores.append({"topic": topic, "score_pct": round(pct, 1), "correct": s["correct"], "total": s["total"]})
+    for topic, correct, total in stats:
+        pct = 0.0 if total == 0 else (correct / total) * 100.0
+        topic_scores.append({"topic": topic, "score_pct": round(pct, 1), "correct": correct, "total": total})
 
     topic_scores.sort(key=lambda x: x["score_pct"], reverse=True)
 
     strengths = [t for t in topic_scores if t["score_pct"] >= 80]
-    focus = [t for t in topic_scores if t["score_pct"] < 60]
+    focus = [t for t in topic_scores if t["score_pct"] < 60][:3]
 
-    # attach resources for focus areas
-    focus_with_resources = []
-    for t in focus:
-        resources = Resource.query.filter_by(topic_tag=t["topic"]).limit(5).all()
-        focus_with_resources.append({
+    # attach resources for focus areas (cached; misses fetched in one windowed query)
+    resources_by_topic = catalog_cache.resources([t["topic"] for t in focus], RESOURCES_PER_TOPIC)
+    focus_with_resources = [
+        {
             **t,
-            "resources": [{"title": r.title, "url": r.url, "type": r.type} for r in resources]
-        })
+            "resources": [
+                {"title": title, "url": url, "type": typ}
+                for title, url, typ in resources_by_topic.get(t["topic"], ())
+            ],
+        }
+        for t in focus
+    ]
 
     return {
         "exam_id": exam_id,
         "summary": {
             "strengths": strengths[:3],
-            "areas_for_focus": focus_with_resources[:3],
+            "areas_for_focus": focus_with_resources,
         },
         "all_topics": topic_scores
     }
@@ -0,0 +1,120 @@
+"""Benchmark: latest-risk lookup via GROUP BY/max subquery vs Student.latest_risk_id pointer.
+
+Builds a throwaway SQLite database (or uses --db) with N students and H
+historical RiskScore rows each, then times both read shapes for one advisor.
+
+Usage (from backend/):
+  python scripts/bench_latest_risk.py --students 5000 --history 50
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def timeit(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return {"p50_ms": round(statistics.median(samples), 2), "max_ms": round(max(samples), 2)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--history", type=int, default=50, help="RiskScore rows per student")
+    parser.add_argument("--advisors", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--db", type=str, default=None, help="DATABASE_URL (default: temp SQLite file)")
+    args = parser.parse_args()
+
+    tmpdir = None
+    if args.db:
+        os.environ["DATABASE_URL"] = args.db
+    else:
+        tmpdir = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_URL"] = f"sqlite:///{Path(tmpdir.name) / 'bench.db'}"
+
+    from sqlalchemy import and_, func, insert
+
+    from app import create_app, db
+    from app.models import Advisor, RiskScore, Student, User
+    from app.services.risk_writer import refresh_latest_risk_pointers
+
+    app = create_app()
+    rng = random.Random(42)
+
+    with app.app_context():
+        t0 = time.perf_counter()
+        db.session.execute(
+            insert(User),
+            [{"id": i, "email": f"bench{i}@pass.local", "password_hash": "x", "role": "advisor" if i <= args.advisors else "student"}
+             for i in range(1, args.advisors + args.students + 1)],
+        )
+        db.session.execute(insert(Advisor), [{"id": a, "user_id": a, "name": f"Advisor {a}"} for a in range(1, args.advisors + 1)])
+        db.session.execute(
+            insert(Student),
+            [{"id": s, "user_id": args.advisors + s, "advisor_id": 1 + s % args.advisors, "name": f"Student {s}"}
+             for s in range(1, args.students + 1)],
+        )
+        start = datetime(2024, 1, 1)
+        batch = []
+        for s in range(1, args.students + 1):
+            for h in range(args.history):
+                batch.append({"student_id": s, "generated_at": start + timedelta(days=h), "risk_probability": rng.random()})
+            if len(batch) >= 50_000:
+                db.session.execute(insert(RiskScore), batch)
+                batch = []
+        if batch:
+            db.session.execute(insert(RiskScore), batch)
+        refresh_latest_risk_pointers()
+        db.session.commit()
+        print(f"Seeded {args.students} students x {args.history} scores in {time.perf_counter() - t0:.1f}s")
+
+        advisor_id = 1
+
+        def group_by_join():
+            ids = [sid for (sid,) in db.session.query(Student.id).filter_by(advisor_id=advisor_id).all()]
+            subq = (
+                db.session.query(RiskScore.student_id.label("student_id"), func.max(RiskScore.generated_at).label("max_gen"))
+                .filter(RiskScore.student_id.in_(ids))
+                .group_by(RiskScore.student_id)
+                .subquery()
+            )
+            return (
+                db.session.query(RiskScore.student_id, RiskScore.risk_probability)
+                .join(subq, and_(RiskScore.student_id == subq.c.student_id, RiskScore.generated_at == subq.c.max_gen))
+                .all()
+            )
+
+        def pointer_join():
+            return (
+                db.session.query(Student.id, RiskScore.risk_probability)
+                .outerjoin(RiskScore, RiskScore.id == Student.latest_risk_id)
+                .filter(Student.advisor_id == advisor_id)
+                .all()
+            )
+
+        assert sorted(group_by_join()) == sorted(pointer_join()), "read paths disagree"
+
+        print(f"group-by/max subquery : {timeit(group_by_join, args.repeat)}")
+        print(f"latest_risk_id pointer: {timeit(pointer_join, args.repeat)}")
+
+    if tmpdir:
+        tmpdir.cleanup()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
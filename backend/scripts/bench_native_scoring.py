@@ -0,0 +1,94 @@
+"""Benchmark: DataFrame + predict_proba vs the compiled NativeScorer, across batch sizes.
+
+Feature signals are loaded from the database once per batch and shared by
+both paths, so only matrix preparation + model evaluation is timed. Fails
+(exit 1) when the two paths disagree by more than PARITY_TOLERANCE.
+
+Usage (from backend/, with a trained model and some students):
+  python scripts/bench_native_scoring.py
+  python scripts/bench_native_scoring.py --sizes 1,8,64,512,4096 --bundle /path/to/risk_model.joblib
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import create_app, db
+from app.models import Student
+from app.services.features import _load_signals, frame_from_signals
+from app.services.native_scorer import PARITY_TOLERANCE, compiled_scorer, parity_error
+from app.services.predict import model_registry
+
+
+def timeit(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=str, default="1,10,100,1000,5000", help="Comma-separated batch sizes")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--bundle", type=str, default=None, help="Model bundle (default: models/risk_model.joblib)")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if args.bundle:
+            model_registry.path = Path(args.bundle)
+            model_registry.invalidate()
+        bundle = model_registry.get()
+        if bundle is None:
+            print("No model bundle; train one first (scripts/train_lightgbm.py).")
+            return 1
+        scorer = compiled_scorer(bundle)
+        if scorer is None:
+            print("Bundle has no LightGBM booster; nothing to compare.")
+            return 1
+
+        sizes = [int(n) for n in args.sizes.split(",")]
+        all_ids = np.array(
+            [sid for (sid,) in db.session.query(Student.id).order_by(Student.id).limit(max(sizes))], dtype=np.int64
+        )
+        if not len(all_ids):
+            print("No students in the database.")
+            return 1
+
+        model = bundle["model"]
+        feature_cols = bundle["feature_columns"]
+        cat_cols = set(bundle.get("categorical_features", []))
+
+        worst = 0.0
+        print(f"{'batch':>7} {'pandas_ms':>10} {'native_ms':>10} {'speed-up':>9} {'max_abs_diff':>13}")
+        for n in sorted({min(n, len(all_ids)) for n in sizes}):
+            ids = all_ids[:n]
+            signals = _load_signals(ids)
+            diff = parity_error(bundle, ids, signals)
+            worst = max(worst, diff)
+
+            pandas_ms = timeit(
+                lambda: model.predict_proba(frame_from_signals(ids, signals, feature_cols, cat_cols))[:, 1], args.repeat
+            )
+            native_ms = timeit(lambda: scorer.predict_signals(ids, signals), args.repeat)
+            print(f"{n:>7} {pandas_ms:>10.3f} {native_ms:>10.3f} {pandas_ms / native_ms:>8.1f}x {diff:>13.2e}", flush=True)
+
+    if worst > PARITY_TOLERANCE:
+        print(f"PARITY FAILED: max abs diff {worst:.2e} > {PARITY_TOLERANCE:.0e}")
+        return 1
+    print(f"Parity OK (max abs diff {worst:.2e})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,90 @@
+"""Benchmark: what-if scoring throughput with concurrent callers.
+
+Compares one DataFrame predict_proba per request (the pre-micro-batching
+path) with requests coalesced by online_scoring.score_batcher. Each caller
+scores one student row; features are loaded once up front, so only matrix
+preparation, queueing and model calls are timed.
+
+Usage (from backend/, with a trained model and some students):
+  python scripts/bench_score_api.py
+  python scripts/bench_score_api.py --callers 200 --requests 50 --max-wait-ms 2
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import create_app, db
+from app.models import Student
+from app.services.features import _load_signals, frame_from_signals
+from app.services.native_scorer import compiled_scorer
+from app.services.online_scoring import score_batcher
+from app.services.predict import model_registry
+
+
+def throughput(fn, callers: int, per_caller: int) -> float:
+    threads = [threading.Thread(target=lambda: [fn() for _ in range(per_caller)]) for _ in range(callers)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return callers * per_caller / (time.perf_counter() - t0)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--callers", type=int, default=100, help="Concurrent threads")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per caller")
+    parser.add_argument("--max-batch-size", type=int, default=None)
+    parser.add_argument("--max-wait-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        bundle = model_registry.get()
+        scorer = compiled_scorer(bundle) if bundle is not None else None
+        if scorer is None:
+            print("No LightGBM bundle; train one first (scripts/train_lightgbm.py).")
+            return 1
+        sid = db.session.query(Student.id).order_by(Student.id).limit(1).scalar()
+        if sid is None:
+            print("No students in the database.")
+            return 1
+        ids = np.array([sid], dtype=np.int64)
+        signals = _load_signals(ids)
+
+    if args.max_batch_size is not None:
+        score_batcher.max_batch_size = args.max_batch_size
+    if args.max_wait_ms is not None:
+        score_batcher.max_wait_ms = args.max_wait_ms
+
+    model = bundle["model"]
+    feature_cols = bundle["feature_columns"]
+    cat_cols = set(bundle.get("categorical_features", []))
+
+    def per_request():
+        model.predict_proba(frame_from_signals(ids, signals, feature_cols, cat_cols))
+
+    def batched():
+        score_batcher.predict(scorer, scorer.matrix(ids, signals).copy())
+
+    print(f"{args.callers} callers x {args.requests} requests, "
+          f"max batch {score_batcher.max_batch_size}, max wait {score_batcher.max_wait_ms} ms")
+    base = throughput(per_request, args.callers, args.requests)
+    fast = throughput(batched, args.callers, args.requests)
+    print(f"  predict_proba per request  {base:>10,.0f} req/s")
+    print(f"  micro-batched              {fast:>10,.0f} req/s  ({fast / base:.1f}x)")
+    print(f"  {score_batcher.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,114 @@
+"""Capture EXPLAIN plans for the hot query shapes and fail on full-table scans.
+
+Runs against DATABASE_URL (SQLite or Postgres). For every hot query it prints
+the plan and exits non-zero if a filtered table is read by a sequential scan
+or if the ORDER BY needs an extra sort instead of walking an index.
+On Postgres, enable_seqscan is turned off for the session so the check reflects
+whether an index *can* serve the query, independent of table size.
+
+Usage (from backend/):
+  python scripts/check_query_plans.py
+"""
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import select, text
+
+from app import create_app, db
+from app.models import Intervention, RiskScore, Student, StudentResponse
+
+
+def hot_queries() -> dict:
+    return {
+        "latest risk per student": (
+            select(RiskScore.id)
+            .where(RiskScore.student_id == 1)
+            .order_by(RiskScore.generated_at.desc())
+            .limit(1)
+        ),
+        "advisor detail interventions": (
+            select(Intervention.id, Intervention.note, Intervention.created_at)
+            .where(Intervention.student_id == 1, Intervention.advisor_id == 1)
+            .order_by(Intervention.created_at.desc())
+            .limit(20)
+        ),
+        "exam responses for student": (
+            select(StudentResponse.question_id, StudentResponse.is_correct)
+            .where(StudentResponse.exam_id == 1, StudentResponse.student_id == 1)
+        ),
+        "students of advisor": (
+            select(Student.id, Student.name).where(Student.advisor_id == 1)
+        ),
+    }
+
+
+def _sqlite_plan(sql: str) -> tuple[list[str], list[str]]:
+    rows = db.session.execute(text("EXPLAIN QUERY PLAN " + sql)).all()
+    details = [r[-1] for r in rows]
+    problems = []
+    for d in details:
+        if d.startswith("SCAN ") and "USING" not in d:
+            problems.append(f"full scan: {d}")
+        if "TEMP B-TREE" in d:
+            problems.append(f"extra sort: {d}")
+    return details, problems
+
+
+def _postgres_plan(sql: str) -> tuple[list[str], list[str]]:
+    db.session.execute(text("SET enable_seqscan = off"))
+    plan = db.session.execute(text("EXPLAIN (FORMAT JSON) " + sql)).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    details, problems = [], []
+
+    def walk(node, depth=0):
+        label = node["Node Type"] + (f" on {node['Relation Name']}" if "Relation Name" in node else "")
+        if "Index Name" in node:
+            label += f" using {node['Index Name']}"
+        details.append("  " * depth + label)
+        if node["Node Type"] == "Seq Scan":
+            problems.append(f"full scan: {label}")
+        if node["Node Type"] == "Sort":
+            problems.append(f"extra sort: {label}")
+        for child in node.get("Plans", []):
+            walk(child, depth + 1)
+
+    walk(plan[0]["Plan"])
+    return details, problems
+
+
+def main() -> int:
+    app = create_app()
+    failed = 0
+    with app.app_context():
+        dialect = db.engine.dialect
+        explain = _postgres_plan if dialect.name == "postgresql" else _sqlite_plan
+
+        for name, stmt in hot_queries().items():
+            sql = str(stmt.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+            details, problems = explain(sql)
+            status = "FAIL" if problems else "ok"
+            print(f"[{status}] {name}")
+            for d in details:
+                print(f"    {d}")
+            for p in problems:
+                print(f"    !! {p}")
+            failed += bool(problems)
+
+        db.session.rollback()
+
+    if failed:
+        print(f"{failed} hot query plan(s) fall back to scans/sorts")
+        return 1
+    print("All hot query plans use indexes.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,92 @@
+"""Check that batch scoring works with a bundle that is not LightGBM.
+
+Builds a small seeded dataset in a temporary SQLite file, fits a scikit-learn
+pipeline bundle (imputer + LogisticRegression) on the DB-derived numeric
+features and runs run_batch_risk_prediction over every student. Fails (exit 1) unless every
+student is scored, the stored probabilities match predict_proba and no local
+explanations were stored (only LightGBM bundles produce them).
+
+Usage (from backend/):
+  python scripts/check_scoring_fallback.py
+"""
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+BACKEND = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND))
+
+DATASET = ["--seed", "7", "--advisors", "3", "--students", "300", "--exams", "2",
+           "--questions", "10", "--responses", "6000", "--history-months", "2"]
+FEATURES = ["exam_accuracy", "responses_total", "exams_taken", "interventions_count", "cohort_year"]
+TOLERANCE = 1e-6
+
+
+def main() -> int:
+    tmpdir = tempfile.TemporaryDirectory()
+    db_url = f"sqlite:///{Path(tmpdir.name) / 'check.db'}"
+    cmd = [sys.executable, str(BACKEND / "scripts" / "generate_synthetic.py"), *DATASET]
+    subprocess.run(cmd, check=True, cwd=BACKEND, env={**os.environ, "DATABASE_URL": db_url}, stdout=subprocess.DEVNULL)
+    os.environ["DATABASE_URL"] = db_url
+
+    import joblib
+    from sklearn.impute import SimpleImputer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+
+    from app import create_app, db
+    from app.models import RiskScore, Student
+    from app.services.features import build_feature_matrix
+    from app.services.predict import model_registry, run_batch_risk_prediction
+
+    app = create_app()
+    with app.app_context():
+        rows = (
+            db.session.query(Student.id, RiskScore.risk_probability)
+            .join(RiskScore, RiskScore.id == Student.latest_risk_id)
+            .order_by(Student.id)
+            .all()
+        )
+        ids = [sid for sid, _ in rows]
+        X = build_feature_matrix(ids, FEATURES, set())
+        y = np.array([p >= 0.25 for _, p in rows], dtype=int)
+        model = make_pipeline(SimpleImputer(), LogisticRegression(max_iter=1000)).fit(X, y)
+        bundle_path = Path(tmpdir.name) / "risk_model.joblib"
+        joblib.dump({"model": model, "feature_columns": FEATURES, "categorical_features": [], "threshold": 0.5}, bundle_path)
+        model_registry.path = bundle_path
+        model_registry.invalidate()
+
+        result = run_batch_risk_prediction()
+        stored = (
+            db.session.query(RiskScore.risk_probability, RiskScore.top_contributions)
+            .join(Student, Student.latest_risk_id == RiskScore.id)
+            .order_by(Student.id)
+            .all()
+        )
+        expected = model.predict_proba(build_feature_matrix(ids, FEATURES, set()))[:, 1]
+
+    problems = []
+    if result["generated"] != len(ids):
+        problems.append(f"scored {result['generated']} of {len(ids)} students")
+    diff = float(np.max(np.abs(np.array([p for p, _ in stored]) - expected))) if stored else float("inf")
+    if diff > TOLERANCE:
+        problems.append(f"stored probabilities differ from predict_proba by {diff:.2e}")
+    if any(blob is not None for _, blob in stored):
+        problems.append("local explanations stored for a non-LightGBM bundle")
+    if problems:
+        print("FAILED:")
+        for p in problems:
+            print(f"  - {p}")
+        return 1
+    print(f"OK: {len(ids)} students scored with a scikit-learn pipeline (max abs diff {diff:.2e})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,42 @@
+"""Retention job: fold old risk_scores rows into weekly risk_score_aggregates.
+
+Run it periodically (e.g. nightly cron) when RISK_HISTORY_MODE=append.
+Each student's latest score is always kept as a raw row.
+
+Usage (from backend/):
+  python scripts/compact_risk_history.py                  # older than RISK_RETENTION_DAYS
+  python scripts/compact_risk_history.py --older-than-days 30 --chunk-size 2000
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import create_app
+from app.services.risk_history import DEFAULT_COMPACT_CHUNK_SIZE, compact_risk_history
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--older-than-days", type=int, default=None, help="Default: RISK_RETENTION_DAYS")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_COMPACT_CHUNK_SIZE, help="Students per commit")
+    args = parser.parse_args()
+
+    app = create_app()
+    t0 = time.perf_counter()
+
+    def report(p: dict) -> None:
+        print(f"  {p['students']:>9,} students  {p['compacted']:>11,} rows -> {p['aggregates']:>9,} weeks", flush=True)
+
+    with app.app_context():
+        result = compact_risk_history(args.older_than_days, chunk_size=args.chunk_size, progress=report)
+    print(f"Done in {time.perf_counter() - t0:.2f}s: {result}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
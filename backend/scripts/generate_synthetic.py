@@ -0,0 +1,364 @@
+"""Generate a large synthetic dataset for load and scale testing.
+
+Everything is bulk-inserted with explicit ids (COPY on Postgres, executemany
+elsewhere); all accounts share one precomputed password hash. Output is
+identical for the same --seed / --as-of and volume options.
+
+Distributions:
+  - advisor caseloads are log-normal (a few advisors carry many students)
+  - each student has a latent ability; it drives exam correctness (with
+    per-topic strengths/weaknesses and per-question difficulty) and risk
+  - risk history is a random walk in logit space, mostly low with a long tail
+  - interventions are more frequent for high-risk students
+
+Accounts: advisor<N>@synth.pass.local / advisor123, student<N>@synth.pass.local / student123
+
+Usage (from backend/, use a fresh DATABASE_URL):
+  python scripts/generate_synthetic.py                      # small preset
+  python scripts/generate_synthetic.py --preset prod        # 200 advisors, 100k students, 10M responses
+  python scripts/generate_synthetic.py --students 20000 --responses 1000000 --seed 7
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import text
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db
+from app.services.catalog_cache import bump_catalog_version
+from app.services.risk_writer import refresh_latest_risk_pointers
+
+PRESETS = {
+    "small": dict(advisors=10, students=2_000, exams=4, questions=40, responses=100_000, history_months=12),
+    "medium": dict(advisors=50, students=20_000, exams=8, questions=60, responses=1_000_000, history_months=24),
+    "prod": dict(advisors=200, students=100_000, exams=12, questions=80, responses=10_000_000, history_months=36),
+}
+
+EMAIL_DOMAIN = "synth.pass.local"
+STUDENT_BLOCK = 5000  # fixed so the output does not depend on batch size
+
+DEPARTMENTS = ["CENG", "EEE", "ME", "CE", "IE", "MATH", "PHYS", "BUS"]
+DEPARTMENT_WEIGHTS = [0.24, 0.16, 0.14, 0.12, 0.1, 0.09, 0.07, 0.08]
+COHORTS = list(range(2019, 2026))
+COHORT_WEIGHTS = [0.06, 0.1, 0.14, 0.17, 0.18, 0.18, 0.17]
+TOPICS = [
+    "Algorithms", "Data Structures", "Graphs", "Dynamic Programming", "Recursion",
+    "Complexity", "Probability", "Linear Algebra", "Databases", "Operating Systems",
+    "Networks", "Discrete Math",
+]
+RESOURCE_TYPES = ["video", "article", "practice"]
+FIRST_NAMES = ["Alex", "Sam", "Mina", "Omar", "Lea", "Deniz", "Yuki", "Ravi", "Ana", "Jon", "Elif", "Noor", "Ken", "Ada"]
+LAST_NAMES = ["Kim", "Ali", "Smith", "Yilmaz", "Garcia", "Chen", "Kaya", "Singh", "Novak", "Silva", "Demir", "Ito"]
+INTERVENTION_NOTES = [
+    "Checked in after missed assignments.",
+    "Discussed study plan for upcoming exam.",
+    "Referred to tutoring center.",
+    "Follow-up on attendance.",
+    "Talked about course load and time management.",
+]
+FACTOR_NAMES = ["exam_accuracy", "responses_total", "exams_taken", "interventions_count", "cohort_year"]
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+# -----------------------
+# Bulk writes
+# -----------------------
+def _next_id(table: str, column: str = "id") -> int:
+    return int(db.session.execute(text(f"SELECT COALESCE(MAX({column}), 0) FROM {table}")).scalar()) + 1
+
+
+def bulk_insert(table: str, columns: list[str], rows: list[tuple], batch: int) -> None:
+    if not rows:
+        return
+    conn = db.session.connection()
+    cols = ", ".join(columns)
+    if conn.dialect.name == "postgresql":
+        cursor = conn.connection.cursor()
+        copy_sql = f"COPY {table} ({cols}) FROM STDIN"
+        if hasattr(cursor, "copy"):  # psycopg 3
+            with cursor.copy(copy_sql) as copy:
+                for row in rows:
+                    copy.write_row(row)
+        else:  # psycopg2
+            buf = io.StringIO()
+            writer = csv.writer(buf, delimiter="\t", lineterminator="\n", quoting=csv.QUOTE_NONE, escapechar="\\")
+            writer.writerows(tuple("\\N" if v is None else v for v in row) for row in rows)
+            buf.seek(0)
+            cursor.copy_expert(copy_sql, buf)
+        return
+
+    if conn.dialect.name == "sqlite":
+        # same text format SQLAlchemy's DateTime uses on SQLite
+        ts_cols = [i for i, v in enumerate(rows[0]) if isinstance(v, datetime)]
+        if ts_cols:
+            rows = [
+                tuple(v.strftime("%Y-%m-%d %H:%M:%S.%f") if i in ts_cols else v for i, v in enumerate(row))
+                for row in rows
+            ]
+
+    mark = "?" if conn.dialect.paramstyle == "qmark" else "%s"
+    sql = f"INSERT INTO {table} ({cols}) VALUES ({', '.join([mark] * len(columns))})"
+    for i in range(0, len(rows), batch):
+        conn.exec_driver_sql(sql, rows[i:i + batch])
+
+
+def _reset_sequences(tables: list[str]) -> None:
+    if db.session.get_bind().dialect.name != "postgresql":
+        return
+    for table in tables:
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT MAX(id) FROM {table}), 1))"
+        ))
+
+
+# -----------------------
+# Generator
+# -----------------------
+class Generator:
+    def __init__(self, args, counts: dict):
+        self.args = args
+        self.counts = counts
+        self.as_of = args.as_of
+        rng = np.random.default_rng([args.seed, 0])
+
+        # advisor caseloads: log-normal weights
+        w = rng.lognormal(mean=0.0, sigma=0.6, size=args.advisors)
+        self.advisor_weights = w / w.sum()
+
+        # exams: each covers 4-7 topics; per-question difficulty
+        self.exam_questions = {}
+        for e in range(args.exams):
+            k = int(rng.integers(4, 8))
+            topics = rng.choice(len(TOPICS), size=k, replace=False)
+            self.exam_questions[e] = (
+                rng.choice(topics, size=args.questions),       # topic index per question
+                rng.normal(0.0, 0.8, size=args.questions),     # difficulty per question
+            )
+
+        self.pw_student = generate_password_hash("student123")
+        self.pw_advisor = generate_password_hash("advisor123")
+
+    def _timed(self, table: str, columns: list[str], rows: list[tuple]) -> None:
+        t0 = time.perf_counter()
+        bulk_insert(table, columns, rows, self.args.batch)
+        self.counts.setdefault(table, [0, 0.0])
+        self.counts[table][0] += len(rows)
+        self.counts[table][1] += time.perf_counter() - t0
+
+    def catalog(self, exam_base: int) -> None:
+        rng = np.random.default_rng([self.args.seed, 1])
+        rows = []
+        for e, (topic_idx, _) in self.exam_questions.items():
+            for q, t in enumerate(topic_idx.tolist(), start=1):
+                rows.append((exam_base + e, q, TOPICS[t]))
+        self._timed("exam_blueprints", ["exam_id", "question_id", "topic_tag"], rows)
+
+        rows = []
+        for topic in TOPICS:
+            slug = topic.lower().replace(" ", "-")
+            for k in range(1, int(rng.integers(3, 9)) + 1):
+                typ = RESOURCE_TYPES[int(rng.integers(len(RESOURCE_TYPES)))]
+                rows.append((topic, f"{topic} {typ} #{k}", f"https://example.org/{slug}/{k}", typ))
+        self._timed("resources", ["topic_tag", "title", "url", "type"], rows)
+        bump_catalog_version()
+        db.session.commit()
+
+    def model_versions(self, version_base: int, count: int = 8) -> None:
+        """A handful of past model versions that the risk history points at."""
+        rng = np.random.default_rng([self.args.seed, 3])
+        weights = np.sort(rng.dirichlet(np.ones(len(FACTOR_NAMES)), size=count), axis=1)[:, ::-1]
+        rows = []
+        for k, w in enumerate(weights):
+            importances = [{"feature": f, "importance": round(float(v), 4)} for f, v in zip(FACTOR_NAMES, w)]
+            trained = self.as_of - timedelta(days=30.4 * (count - k))
+            rows.append((
+                version_base + k, f"synthetic:{self.args.seed}:{k}", json.dumps(FACTOR_NAMES), 0.5,
+                json.dumps(importances), trained, trained,
+            ))
+        self._timed("model_versions", [
+            "id", "bundle_hash", "feature_columns_json", "threshold", "importances_json", "trained_at", "created_at",
+        ], rows)
+        self.version_ids = [row[0] for row in rows]
+        db.session.commit()
+
+    def advisors(self, user_base: int, advisor_base: int) -> None:
+        a = self.args
+        users = [
+            (user_base + i, f"advisor{i + 1}@{EMAIL_DOMAIN}", self.pw_advisor, "advisor")
+            for i in range(a.advisors)
+        ]
+        advisors = [(advisor_base + i, user_base + i, f"Dr. Advisor {i + 1}", 0) for i in range(a.advisors)]
+        self._timed("users", ["id", "email", "password_hash", "role"], users)
+        self._timed("advisors", ["id", "user_id", "name", "data_version"], advisors)
+        db.session.commit()
+
+    def student_block(self, block: int, bases: dict, exam_base: int, responses_per_student: float) -> None:
+        a = self.args
+        rng = np.random.default_rng([a.seed, 2, block])
+        start = block * STUDENT_BLOCK
+        n = min(STUDENT_BLOCK, a.students - start)
+        idx = np.arange(start, start + n)
+
+        ability = rng.normal(0.0, 1.0, size=n)
+        advisor_idx = rng.choice(a.advisors, size=n, p=self.advisor_weights)
+        dept = rng.choice(len(DEPARTMENTS), size=n, p=DEPARTMENT_WEIGHTS)
+        cohort = rng.choice(COHORTS, size=n, p=COHORT_WEIGHTS)
+        first = rng.integers(len(FIRST_NAMES), size=n)
+        last = rng.integers(len(LAST_NAMES), size=n)
+
+        user_ids = bases["users"] + idx
+        student_ids = bases["students"] + idx
+        self._timed("users", ["id", "email", "password_hash", "role"], [
+            (int(u), f"student{i + 1}@{EMAIL_DOMAIN}", self.pw_student, "student")
+            for u, i in zip(user_ids.tolist(), idx.tolist())
+        ])
+        self._timed("students", ["id", "user_id", "advisor_id", "name", "department", "cohort_year"], [
+            (s, u, bases["advisors"] + adv, f"{FIRST_NAMES[f]} {LAST_NAMES[l]}", DEPARTMENTS[d], c)
+            for s, u, adv, f, l, d, c in zip(
+                student_ids.tolist(), user_ids.tolist(), advisor_idx.tolist(),
+                first.tolist(), last.tolist(), dept.tolist(), cohort.tolist(),
+            )
+        ])
+
+        # --- risk history: monthly-ish random walk in logit space, newest within the last week ---
+        final_risk = _sigmoid(-2.2 - 1.3 * ability + rng.normal(0.0, 0.5, size=n))
+        h = a.history_months
+        if h > 0:
+            steps = rng.normal(0.0, 0.18, size=(n, h))
+            walk = np.cumsum(steps[:, ::-1], axis=1)[:, ::-1]  # 0 at the newest point
+            logits = np.log(final_risk / (1 - final_risk))[:, None] + walk - walk[:, -1:]
+            probs = _sigmoid(logits)
+            final_risk = probs[:, -1]
+            days_ago = (np.arange(h)[::-1] * 30.4)[None, :] + rng.uniform(0, 7, size=(n, h))
+            versions = [self.version_ids[j * len(self.version_ids) // h] for j in range(h)]  # oldest first
+            rs_ids = bases["risk_scores"] + block * STUDENT_BLOCK * h + np.arange(n * h)
+            rows = []
+            for i, sid in enumerate(student_ids.tolist()):
+                for j in range(h):
+                    rows.append((
+                        int(rs_ids[i * h + j]), sid,
+                        self.as_of - timedelta(days=float(days_ago[i, j])),
+                        round(float(probs[i, j]), 6),
+                        versions[j],
+                    ))
+            self._timed("risk_scores", ["id", "student_id", "generated_at", "risk_probability", "model_version_id"], rows)
+
+        # --- interventions: Poisson, more for high-risk students ---
+        n_int = rng.poisson(a.interventions_rate * (0.3 + 3.0 * final_risk))
+        total_int = int(n_int.sum())
+        owner = np.repeat(np.arange(n), n_int)
+        int_days = rng.uniform(0, max(1, h * 30.4), size=total_int)
+        notes = rng.integers(len(INTERVENTION_NOTES), size=total_int)
+        int_base = bases["interventions"] + self.counts.get("interventions", [0])[0]
+        self._timed("interventions", ["id", "advisor_id", "student_id", "note", "created_at"], [
+            (int_base + k, bases["advisors"] + int(advisor_idx[o]), int(student_ids[o]),
+             INTERVENTION_NOTES[nt], self.as_of - timedelta(days=float(d)))
+            for k, (o, nt, d) in enumerate(zip(owner.tolist(), notes.tolist(), int_days.tolist()))
+        ])
+
+        # --- responses: each student takes k exams (all questions of each) ---
+        exams_per_student = responses_per_student / a.questions
+        k = np.minimum(rng.poisson(exams_per_student, size=n), a.exams)
+        order = np.argsort(rng.random((n, a.exams)), axis=1)
+        topic_skill = rng.normal(0.0, 0.6, size=(n, len(TOPICS)))
+        rows = []
+        for e in range(a.exams):
+            takers = np.nonzero((order == e).argmax(axis=1) < k)[0]  # exam e is among the student's first k
+            if not len(takers):
+                continue
+            topic_idx, difficulty = self.exam_questions[e]
+            logit = (
+                0.6 + 1.2 * ability[takers, None]
+                + topic_skill[takers][:, topic_idx]
+                - difficulty[None, :]
+            )
+            correct = rng.random(logit.shape) < _sigmoid(logit)
+            exam_id = exam_base + e
+            for t, row in zip(student_ids[takers].tolist(), correct.tolist()):
+                rows.extend((exam_id, t, q, c) for q, c in enumerate(row, start=1))
+        self._timed("student_responses", ["exam_id", "student_id", "question_id", "is_correct"], rows)
+
+        db.session.commit()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--as-of", type=lambda s: datetime.fromisoformat(s), default=None,
+                        help="Newest timestamp in the history (default: today 00:00)")
+    parser.add_argument("--advisors", type=int)
+    parser.add_argument("--students", type=int)
+    parser.add_argument("--exams", type=int)
+    parser.add_argument("--questions", type=int, help="Questions per exam")
+    parser.add_argument("--responses", type=int, help="Approximate total responses")
+    parser.add_argument("--history-months", type=int, help="Risk scores per student (about one per month)")
+    parser.add_argument("--interventions-rate", type=float, default=0.8, help="Mean interventions per average student")
+    parser.add_argument("--batch", type=int, default=10_000, help="Rows per executemany call")
+    args = parser.parse_args()
+
+    for key, value in PRESETS[args.preset].items():
+        if getattr(args, key) is None:
+            setattr(args, key, value)
+    if args.as_of is None:
+        args.as_of = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    args.exams = max(1, args.exams)
+    args.questions = max(1, args.questions)
+
+    app = create_app()
+    with app.app_context():
+        exists = db.session.execute(
+            text("SELECT 1 FROM users WHERE email = :e"), {"e": f"advisor1@{EMAIL_DOMAIN}"}
+        ).first()
+        if exists:
+            print(f"Synthetic data already present (advisor1@{EMAIL_DOMAIN}); use a fresh DATABASE_URL.")
+            return 1
+
+        t0 = time.perf_counter()
+        counts: dict = {}
+        gen = Generator(args, counts)
+        exam_base = _next_id("exam_blueprints", "exam_id")
+        bases = {t: _next_id(t) for t in ("users", "advisors", "students", "risk_scores", "interventions")}
+        # students' users come right after the advisors' users
+        gen.catalog(exam_base)
+        gen.model_versions(_next_id("model_versions"))
+        gen.advisors(bases["users"], bases["advisors"])
+        bases["users"] += args.advisors
+
+        blocks = (args.students + STUDENT_BLOCK - 1) // STUDENT_BLOCK
+        per_student = args.responses / max(1, args.students)
+        for block in range(blocks):
+            gen.student_block(block, bases, exam_base, per_student)
+            done = min(args.students, (block + 1) * STUDENT_BLOCK)
+            print(f"  {done:>9,} / {args.students:,} students  ({time.perf_counter() - t0:.1f}s)", flush=True)
+
+        refresh_latest_risk_pointers()
+        _reset_sequences(["users", "advisors", "students", "risk_scores", "interventions", "model_versions",
+                          "student_responses", "exam_blueprints", "resources"])
+        db.session.commit()
+
+        print(f"Done in {time.perf_counter() - t0:.1f}s (seed={args.seed}, as_of={args.as_of.date()})")
+        for table, (rows, seconds) in counts.items():
+            rate = rows / seconds if seconds > 0 else 0.0
+            print(f"  {table:<18} {rows:>12,} rows  {rate:>12,.0f} rows/s")
+        print(f"Exams: {exam_base}..{exam_base + args.exams - 1}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,60 @@
+"""Bulk-load exam blueprints or student responses from CSV / NDJSON.
+
+Columns / keys:
+  blueprints: exam_id, question_id, topic_tag
+  responses:  exam_id, student_id, question_id, is_correct (1/0, true/false, yes/no)
+
+Existing rows are updated in place (uq_exam_question / uq_resp), so re-running
+a file is safe. Load the blueprint before the responses for that exam.
+
+Usage (from backend/):
+  python scripts/ingest.py blueprints data/exam1_blueprint.csv
+  python scripts/ingest.py responses data/exam1_responses.ndjson --chunk-size 10000
+  cat responses.csv | python scripts/ingest.py responses - --format csv
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import create_app
+from app.services.ingest import DEFAULT_CHUNK_SIZE, ingest_blueprints, ingest_responses, iter_records, read_records
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("kind", choices=["blueprints", "responses"])
+    parser.add_argument("path", help="Input file, or - for stdin (needs --format)")
+    parser.add_argument("--format", choices=["csv", "ndjson"], default=None, help="Default: from the file extension")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per bulk write / commit")
+    args = parser.parse_args()
+
+    if args.path == "-":
+        if not args.format:
+            parser.error("--format is required when reading stdin")
+        records = read_records(sys.stdin, args.format)
+    else:
+        records = iter_records(args.path, args.format)
+
+    def report(p: dict) -> None:
+        print(
+            f"  {p['read']:>10,} read  {p['written']:>10,} written  {p['rejected']:>8,} rejected  "
+            f"{p['rows_per_s'] or 0:>10,.0f} rows/s",
+            flush=True,
+        )
+
+    ingest = ingest_blueprints if args.kind == "blueprints" else ingest_responses
+
+    app = create_app()
+    with app.app_context():
+        result = ingest(records, chunk_size=args.chunk_size, progress=report)
+
+    print(f"Done in {result['seconds']:.2f}s: {result}")
+    return 1 if result["rejected"] and not result["written"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
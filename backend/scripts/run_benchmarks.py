@@ -0,0 +1,335 @@
+"""Reproducible benchmarks for the hot API endpoints and service functions.
+
+Builds a fixed-size seeded dataset in a temporary SQLite file (via
+generate_synthetic.py) plus a small deterministic LightGBM bundle, then runs
+every case many times and records, per case:
+  - latency p50 / p95 / p99 / mean (ms)
+  - SQL statements per call
+  - peak Python memory of one call (tracemalloc, KiB)
+
+The report is written as JSON and compared against a stored baseline:
+p50 latency may grow by at most --tolerance, p95 (noisier for millisecond-scale
+cases) by at most --tail-tolerance, memory by --memory-tolerance, and query
+counts may not grow at all. Exit code 1 on any regression.
+
+The model is a 60-tree toy trained on the synthetic data, so the prediction
+cases track the code around the model call, not the cost of the shipped
+bundle (models/risk_model.joblib has 800 trees); time that with
+scripts/bench_native_scoring.py --bundle.
+
+Usage (from backend/):
+  python scripts/run_benchmarks.py
+  python scripts/run_benchmarks.py --only study_plan_service,login_http --iterations 200
+  python scripts/run_benchmarks.py --update-baseline     # after an intended change
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+BACKEND = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND))
+
+DEFAULT_BASELINE = BACKEND / "benchmarks" / "baseline.json"
+DEFAULT_OUT = BACKEND / "reports" / "benchmark.json"
+
+# Fixed dataset: changing any of these invalidates the stored baseline
+DATASET = {
+    "seed": 1234,
+    "as_of": "2026-01-01",
+    "advisors": 20,
+    "students": 3000,
+    "exams": 4,
+    "questions": 40,
+    "responses": 240000,
+    "history_months": 12,
+}
+PREDICTION_BATCH = 1000
+MIN_SAMPLES = 20  # fewer makes p95 little more than the slowest single call
+
+
+def build_dataset(db_url: str) -> None:
+    cmd = [sys.executable, str(BACKEND / "scripts" / "generate_synthetic.py"), "--preset", "small"]
+    for key, value in DATASET.items():
+        cmd += [f"--{key.replace('_', '-')}", str(value)]
+    subprocess.run(cmd, check=True, cwd=BACKEND, env={**os.environ, "DATABASE_URL": db_url}, stdout=subprocess.DEVNULL)
+
+
+def train_bundle(path: Path) -> None:
+    """Tiny deterministic model over the DB-derived features (labels: latest risk >= 0.25)."""
+    import joblib
+    from lightgbm import LGBMClassifier
+
+    from app import db
+    from app.models import RiskScore, Student
+    from app.services.features import build_feature_matrix
+
+    rows = (
+        db.session.query(Student.id, RiskScore.risk_probability)
+        .join(RiskScore, RiskScore.id == Student.latest_risk_id)
+        .order_by(Student.id)
+        .all()
+    )
+    ids = [sid for sid, _ in rows]
+    y = np.array([p >= 0.25 for _, p in rows], dtype=int)
+    feature_cols = ["exam_accuracy", "responses_total", "exams_taken", "interventions_count", "cohort_year", "department"]
+    cat_cols = ["department"]
+    X = build_feature_matrix(ids, feature_cols, set(cat_cols))
+
+    model = LGBMClassifier(
+        n_estimators=60, num_leaves=15, learning_rate=0.1,
+        random_state=DATASET["seed"], deterministic=True, force_row_wise=True, n_jobs=1, verbose=-1,
+    )
+    model.fit(X, y, categorical_feature=cat_cols)
+    joblib.dump({"model": model, "feature_columns": feature_cols, "categorical_features": cat_cols, "threshold": 0.5}, path)
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+
+def _percentiles(samples_ms: list[float]) -> dict:
+    a = np.asarray(samples_ms)
+    return {
+        "p50_ms": round(float(np.percentile(a, 50)), 3),
+        "p95_ms": round(float(np.percentile(a, 95)), 3),
+        "p99_ms": round(float(np.percentile(a, 99)), 3),
+        "mean_ms": round(float(a.mean()), 3),
+    }
+
+
+def run_case(fn, iterations: int, warmup: int, counter: QueryCounter, teardown, setup=None) -> dict:
+    if setup is not None:
+        setup()
+        teardown()
+    for i in range(warmup):
+        fn(i)
+        teardown()
+
+    samples, queries = [], []
+    for i in range(iterations):
+        before = counter.count
+        t0 = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - t0) * 1000.0)
+        queries.append(counter.count - before)
+        teardown()
+
+    # memory in a separate call: tracemalloc would distort the timings
+    tracemalloc.start()
+    fn(iterations)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    teardown()
+
+    return {
+        "iterations": iterations,
+        **_percentiles(samples),
+        # median: periodic cache version checks add an occasional extra statement
+        "queries_per_call": int(statistics.median(queries)),
+        "max_queries": max(queries),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def build_cases(app, client):
+    from app import db
+    from app.models import Advisor, Student, StudentResponse, User
+    from app.routes.advisor import _students_payload_for_advisor
+    from app.services.predict import run_batch_risk_prediction
+    from app.services.response_cache import response_cache
+    from app.services.study_planner import build_study_plan_for_student
+
+    advisors = db.session.query(Advisor.id, User.email).join(User, User.id == Advisor.user_id).order_by(Advisor.id).all()
+    pairs = (
+        db.session.query(StudentResponse.student_id, StudentResponse.exam_id, User.email)
+        .join(Student, Student.id == StudentResponse.student_id)
+        .join(User, User.id == Student.user_id)
+        .distinct()
+        .order_by(StudentResponse.student_id, StudentResponse.exam_id)
+        .limit(200)
+        .all()
+    )
+    batch_ids = [sid for (sid,) in db.session.query(Student.id).order_by(Student.id).limit(PREDICTION_BATCH)]
+
+    def token(email, password):
+        return client.post("/api/login", json={"email": email, "password": password}).get_json()["access_token"]
+
+    advisor_headers = [{"Authorization": f"Bearer {token(email, 'advisor123')}"} for _, email in advisors]
+    student_headers = {}
+    for _, _, email in pairs[:20]:
+        if email not in student_headers:
+            student_headers[email] = {"Authorization": f"Bearer {token(email, 'student123')}"}
+    http_pairs = [(exam_id, student_headers[email]) for _, exam_id, email in pairs[:20]]
+
+    def login_http(i):
+        email = advisors[i % len(advisors)][1]
+        assert client.post("/api/login", json={"email": email, "password": "advisor123"}).status_code == 200
+
+    def students_payload_service(i):
+        _students_payload_for_advisor(advisors[i % len(advisors)][0])
+
+    def students_http(i):
+        response_cache.clear()  # measure the uncached path
+        assert client.get("/api/advisor/students", headers=advisor_headers[i % len(advisors)]).status_code == 200
+
+    def risk_list_http(i):
+        response_cache.clear()
+        assert client.get("/api/advisor/risk-list?limit=50", headers=advisor_headers[i % len(advisors)]).status_code == 200
+
+    def study_plan_service(i):
+        sid, exam_id, _ = pairs[i % len(pairs)]
+        build_study_plan_for_student(sid, exam_id)
+
+    def study_plan_http(i):
+        exam_id, headers = http_pairs[i % len(http_pairs)]
+        assert client.get(f"/api/student/study-plan?exam_id={exam_id}", headers=headers).status_code == 200
+
+    def batch_prediction(i):
+        run_batch_risk_prediction(student_ids=batch_ids)
+
+    def score_batch():
+        run_batch_risk_prediction(student_ids=batch_ids)
+
+    def batch_prediction_unchanged(i):
+        # score_batch ran first: every score is current, so nothing is re-scored
+        assert run_batch_risk_prediction(student_ids=batch_ids, incremental=True)["rescored"] == 0
+
+    # name -> (fn, iterations scale[, untimed setup])
+    return {
+        "login_http": (login_http, 0.2),
+        "students_payload_service": (students_payload_service, 1.0),
+        "students_http": (students_http, 1.0),
+        "risk_list_http": (risk_list_http, 1.0),
+        "study_plan_service": (study_plan_service, 1.0),
+        "study_plan_http": (study_plan_http, 1.0),
+        "batch_prediction": (batch_prediction, 0.05),
+        "batch_prediction_unchanged": (batch_prediction_unchanged, 0.2, score_batch),
+    }
+
+
+def compare(
+    report: dict, baseline: dict, tolerance: float, tail_tolerance: float, memory_tolerance: float, slack_ms: float
+) -> list[str]:
+    if baseline.get("dataset") != report["dataset"]:
+        return ["dataset definition differs from the baseline; re-run with --update-baseline"]
+
+    problems = []
+    for name, cur in report["cases"].items():
+        base = baseline.get("cases", {}).get(name)
+        if base is None:
+            continue
+        for key, allowed in (("p50_ms", tolerance), ("p95_ms", tail_tolerance)):
+            # relative tolerance, with an absolute floor for sub-millisecond cases
+            limit = max(base[key] * (1 + allowed), base[key] + slack_ms)
+            if cur[key] > limit:
+                problems.append(f"{name}: {key} {cur[key]:.2f} > {base[key]:.2f} (+{allowed:.0%})")
+        if cur["queries_per_call"] > base["queries_per_call"]:
+            problems.append(f"{name}: queries_per_call {cur['queries_per_call']} > {base['queries_per_call']}")
+        if cur["peak_kib"] > base["peak_kib"] * (1 + memory_tolerance):
+            problems.append(f"{name}: peak_kib {cur['peak_kib']} > {base['peak_kib']} (+{memory_tolerance:.0%})")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=100, help="Calls per case (scaled down for slow cases)")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--only", type=str, default=None, help="Comma-separated case names")
+    parser.add_argument("--out", type=Path, default=DEFAULT_OUT)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.30, help="Allowed latency growth (0.30 = +30%%)")
+    parser.add_argument("--tail-tolerance", type=float, default=1.0, help="Allowed p95 growth (1.0 = +100%%)")
+    parser.add_argument("--slack-ms", type=float, default=1.0, help="Latency growth always allowed, in ms")
+    parser.add_argument("--memory-tolerance", type=float, default=0.20)
+    parser.add_argument("--update-baseline", action="store_true", help="Write this run as the new baseline")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    db_url = f"sqlite:///{Path(tmpdir.name) / 'bench.db'}"
+    print("Building dataset ...", flush=True)
+    build_dataset(db_url)
+    os.environ["DATABASE_URL"] = db_url
+
+    from app import create_app, db
+    from app.services.predict import model_registry
+
+    app = create_app()
+    with app.app_context():
+        bundle_path = Path(tmpdir.name) / "risk_model.joblib"
+        train_bundle(bundle_path)
+        model_registry.path = bundle_path
+        model_registry.invalidate()
+
+        counter = QueryCounter(db.engine)
+        client = app.test_client()
+        cases = build_cases(app, client)
+        selected = args.only.split(",") if args.only else list(cases)
+
+        results = {}
+        for name in selected:
+            fn, scale, *setup = cases[name]
+            n = max(MIN_SAMPLES, int(args.iterations * scale))
+            results[name] = run_case(fn, n, args.warmup, counter, db.session.remove, *setup)
+            r = results[name]
+            print(
+                f"  {name:<26} p50 {r['p50_ms']:>9.2f}  p95 {r['p95_ms']:>9.2f}  p99 {r['p99_ms']:>9.2f} ms"
+                f"  {r['queries_per_call']:>3} queries  {r['peak_kib']:>9.1f} KiB",
+                flush=True,
+            )
+
+    report = {
+        "dataset": DATASET,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "cases": results,
+    }
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Report: {args.out}")
+
+    if args.update_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print("No baseline yet; run with --update-baseline to record one.")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    baseline["cases"] = {k: v for k, v in baseline.get("cases", {}).items() if k in results}
+    problems = compare(report, baseline, args.tolerance, args.tail_tolerance, args.memory_tolerance, args.slack_ms)
+    if problems:
+        print("REGRESSIONS:")
+        for p in problems:
+            print(f"  - {p}")
+        return 1
+    print(f"OK: within tolerance of {args.baseline.name}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
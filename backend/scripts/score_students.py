@@ -0,0 +1,79 @@
+"""Re-score risk for every student (or a given set) in bounded-memory chunks.
+
+Usage (from backend/):
+  python scripts/score_students.py
+  python scripts/score_students.py --chunk-size 5000
+  python scripts/score_students.py --ids 1 2 3
+  python scripts/score_students.py --incremental            # only students with stale scores
+  python scripts/score_students.py --workers 4              # process pool, one bulk write
+  python scripts/score_students.py --benchmark 1,2,4,8      # speed-up curve, no writes
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import create_app
+from app.services.parallel_scoring import run_parallel_risk_prediction, score_in_process_pool
+from app.services.predict import run_batch_risk_prediction
+
+
+def benchmark(core_counts: list[int], ids: list[int] | None, shard_size: int) -> None:
+    print(f"{'workers':>8} {'startup_s':>10} {'score_s':>9} {'speed-up':>9} {'students/s':>11}")
+    base = None
+    for n in core_counts:
+        got_ids, _, _, t = score_in_process_pool(ids, workers=n, shard_size=shard_size)
+        base = base or t["score_s"]
+        speedup = base / t["score_s"] if t["score_s"] else float("nan")
+        rate = len(got_ids) / t["score_s"] if t["score_s"] else float("nan")
+        print(f"{n:>8} {t['startup_s']:>10.2f} {t['score_s']:>9.2f} {speedup:>8.2f}x {rate:>11,.0f}", flush=True)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunk-size", type=int, default=None, help="Students per chunk (default: SCORING_CHUNK_SIZE)")
+    parser.add_argument("--ids", type=int, nargs="*", default=None, help="Only score these student ids")
+    parser.add_argument("--incremental", action="store_true", help="Skip students whose latest score is current")
+    parser.add_argument("--workers", type=int, default=0, help="Score on N processes (0 = in-process chunks)")
+    parser.add_argument("--shard-size", type=int, default=5000, help="Students per process-pool task")
+    parser.add_argument("--benchmark", type=str, default=None, help="Comma-separated worker counts, e.g. 1,2,4")
+    args = parser.parse_args()
+
+    app = create_app()
+    t0 = time.perf_counter()
+
+    if args.benchmark:
+        with app.app_context():
+            benchmark([int(n) for n in args.benchmark.split(",")], args.ids, args.shard_size)
+        return 0
+
+    if args.workers > 0:
+        with app.app_context():
+            result = run_parallel_risk_prediction(args.ids, workers=args.workers, shard_size=args.shard_size)
+        print(f"Done in {time.perf_counter() - t0:.2f}s: {result}")
+        return 0
+
+    def report(p: dict) -> None:
+        elapsed = time.perf_counter() - t0
+        rate = p["processed"] / elapsed if elapsed > 0 else 0.0
+        print(
+            f"  {p['processed']}/{p['total']} students "
+            f"(created={p['created']} updated={p['updated']} skipped={p['skipped']}) {rate:,.0f} students/s",
+            flush=True,
+        )
+
+    with app.app_context():
+        result = run_batch_risk_prediction(
+            student_ids=args.ids, chunk_size=args.chunk_size, progress=report, incremental=args.incremental
+        )
+
+    print(f"Done in {time.perf_counter() - t0:.2f}s: {result}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
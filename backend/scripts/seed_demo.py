@@ -11,6 +11,8 @@ sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 from app import create_app, db
 from app.models import User, Advisor, Student, Resource, ExamBlueprint, StudentResponse
+from app.services.catalog_cache import bump_catalog_version
+from app.services.score_inputs import mark_inputs_changed
 
 app = create_app()
 
@@ -67,12 +69,16 @@ with app.app_context():
         if not ExamBlueprint.query.filter_by(exam_id=1, question_id=qid).first():
             db.session.add(ExamBlueprint(exam_id=1, question_id=qid, topic_tag=topic))
 
+    # blueprint/resources changed: invalidate per-process catalog caches
+    bump_catalog_version()
+
     # Responses for student1 (Alex): good at DS, weak at Algorithms
     s1 = students[0]
     resp = {1: True, 2: False, 3: False, 4: True, 5: True}
     for qid, is_correct in resp.items():
         if not StudentResponse.query.filter_by(exam_id=1, student_id=s1.id, question_id=qid).first():
             db.session.add(StudentResponse(exam_id=1, student_id=s1.id, question_id=qid, is_correct=is_correct))
+    mark_inputs_changed([s1.id])
 
     db.session.commit()
     print("Seed complete.")
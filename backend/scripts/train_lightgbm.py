@@ -21,6 +21,8 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
+from datetime import datetime
 from pathlib import Path
 
 import joblib
@@ -234,9 +236,15 @@ def main() -> None:
         "categorical_features": cat_features,
         "target_info": {"original_target_column": target_col, "binary": True},
         "threshold": float(args.threshold),
+        "trained_at": datetime.utcnow().isoformat(timespec="seconds"),
     }
 
-    joblib.dump(bundle, outdir / "risk_model.joblib")
+    # Write to a temp file then rename: the API hot-reloads this file by mtime,
+    # so it must never observe a half-written bundle.
+    bundle_path = outdir / "risk_model.joblib"
+    tmp_path = bundle_path.with_suffix(".joblib.tmp")
+    joblib.dump(bundle, tmp_path)
+    os.replace(tmp_path, bundle_path)
     (reports_dir / "metrics.json").write_text(json.dumps(metrics, indent=2), encoding="utf-8")
     (reports_dir / "classification_report.json").write_text(json.dumps(report, indent=2), encoding="utf-8")
     fi.to_csv(reports_dir / "feature_importance.csv", index=False)
@@ -26,7 +26,9 @@ export function AuthProvider({ children }) {
     }
   }
 
-  function logout() {
+  async function logout() {
+    // revokes the token server-side; sign out locally even if that fails
+    await api("/logout", { method: "POST" }).catch(() => {});
     clearToken();
     setMe(null);
   }
@@ -6,8 +6,8 @@ function TopBar() {
   const { me, logout } = useAuth();
   const navigate = useNavigate();
 
-  const onLogout = () => {
-    logout();
+  const onLogout = async () => {
+    await logout();
     navigate("/login");
   };
 
@@ -20,7 +20,16 @@ export default function AdvisorDashboard() {
 
   const predict = async () => {
     setMsg("Running predictions...");
-    await api("/advisor/predict-risk", { method:"POST" });
+    let job = await api("/advisor/predict-risk", { method:"POST" });
+    while (job.status === "queued" || job.status === "running") {
+      await new Promise(r => setTimeout(r, 1000));
+      job = await api(`/advisor/predict-risk/${job.job_id}`);
+      if (job.progress?.pct != null) setMsg(`Running predictions... ${job.progress.pct}%`);
+    }
+    if (job.status === "failed") {
+      setMsg(`Prediction failed: ${job.error || "unknown error"}`);
+      return;
+    }
     setMsg("Done. Refreshing list...");
     await load();
     setMsg("Updated.");
@@ -69,13 +78,24 @@ export default function AdvisorDashboard() {
 
             <div style={{marginTop:12, padding:12, border:"1px solid #2a2a2a", borderRadius:12}}>
               <b>XAI (Top Factors)</b>
-              <div style={{fontSize:12, opacity:0.8, marginBottom:8}}>Simple feature importance (MVP).</div>
-              {selected.latest_risk?.top_factors?.length ? (
-                <ul>
-                  {selected.latest_risk.top_factors.map((f, idx)=>(
-                    <li key={idx}>{f.feature}: {f.importance.toFixed(2)}</li>
-                  ))}
-                </ul>
+              {selected.latest_risk?.local_factors?.length ? (
+                <>
+                  <div style={{fontSize:12, opacity:0.8, marginBottom:8}}>This student's strongest factors (+ raises risk, − lowers it).</div>
+                  <ul>
+                    {selected.latest_risk.local_factors.map((f, idx)=>(
+                      <li key={idx}>{f.feature}: {f.contribution >= 0 ? "+" : "−"}{Math.abs(f.contribution).toFixed(2)}</li>
+                    ))}
+                  </ul>
+                </>
+              ) : selected.latest_risk?.top_factors?.length ? (
+                <>
+                  <div style={{fontSize:12, opacity:0.8, marginBottom:8}}>Simple feature importance (MVP).</div>
+                  <ul>
+                    {selected.latest_risk.top_factors.map((f, idx)=>(
+                      <li key={idx}>{f.feature}: {f.importance.toFixed(2)}</li>
+                    ))}
+                  </ul>
+                </>
               ) : (
                 <div style={{opacity:0.8}}>No explanation available yet.</div>
               )}